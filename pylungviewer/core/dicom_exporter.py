@@ -19,6 +19,29 @@ logger = logging.getLogger(__name__)
 MASK_ALPHA_FOR_PNG = 80 / 255.0 
 MASK_COLOR_BGR = (0, 0, 255)
 
+
+def _normalize_to_uint8(pixel_data):
+    """
+    Линейное растяжение среза от минимума до максимума в диапазон 0-255.
+    Вычисление идет в float32 (float64 для float64 среза), поэтому разность
+    значений int16 среза не переполняется.
+    
+    Args:
+        pixel_data: Срез в HU.
+        
+    Returns:
+        numpy.ndarray: Изображение uint8 (нулевое для постоянного среза).
+    """
+    min_val, max_val = np.min(pixel_data), np.max(pixel_data)
+    if not max_val > min_val:
+        return np.zeros_like(pixel_data, dtype=np.uint8)
+    normalized = np.subtract(pixel_data, min_val, dtype=np.result_type(pixel_data.dtype, np.float32))
+    np.multiply(normalized, 255.0, out=normalized)
+    np.divide(normalized, float(max_val) - float(min_val), out=normalized)
+    np.clip(normalized, 0, 255, out=normalized)
+    return normalized.astype(np.uint8)
+
+
 class ExportWorker(QObject):
     """Воркер для выполнения экспорта в фоновом потоке."""
     finished = pyqtSignal()
@@ -138,12 +161,7 @@ class ExportWorker(QObject):
                 window_center, window_width = WindowPresets.get_preset("Легочное")
                 img_gray = WindowPresets.apply_window(pixel_data_hu, window_center, window_width)
             else:
-                min_hu, max_hu = np.min(pixel_data_hu), np.max(pixel_data_hu)
-                if max_hu > min_hu:
-                     img_normalized = 255 * (pixel_data_hu - min_hu) / (max_hu - min_hu)
-                     img_gray = np.clip(img_normalized, 0, 255).astype(np.uint8)
-                else:
-                     img_gray = np.zeros_like(pixel_data_hu, dtype=np.uint8)
+                img_gray = _normalize_to_uint8(pixel_data_hu)
 
             if mask_slice is not None:
                 logger.info(f"Накладываем маску на PNG: {os.path.basename(dest_path_png)}")
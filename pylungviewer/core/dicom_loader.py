@@ -5,6 +5,7 @@
 
 import os
 import logging
+import importlib.util
 import pydicom
 import numpy as np
 from collections import defaultdict
@@ -13,6 +14,131 @@ from PyQt5.QtCore import QObject, pyqtSignal, QSettings
 
 logger = logging.getLogger(__name__)
 
+# Обработчики pydicom 2.x, освобождающие GIL при декодировании сжатых данных (в порядке предпочтения)
+_GIL_RELEASING_HANDLERS = ('pylibjpeg_handler', 'gdcm_handler')
+_pixel_handlers_configured = False
+
+
+def _configure_pixel_data_handlers():
+    """
+    Однократно настраивает декодеры пиксельных данных для параллельной загрузки срезов.
+    В pydicom 2.x обработчики pylibjpeg и gdcm (освобождают GIL) переносятся в начало списка,
+    в pydicom 3.x они и так имеют приоритет. Если pylibjpeg не установлен, выводится предупреждение:
+    сжатые серии тогда декодируются через pillow и масштабируются по потокам хуже.
+    """
+    global _pixel_handlers_configured
+    if _pixel_handlers_configured:
+        return
+    _pixel_handlers_configured = True
+
+    if importlib.util.find_spec('pylibjpeg') is None:
+        logger.warning("pylibjpeg не установлен: декодирование сжатых DICOM может не распараллеливаться по потокам.")
+
+    if importlib.util.find_spec('pydicom.pixels') is not None:
+        return # pydicom 3.x: плагины gdcm/pylibjpeg уже первые для JPEG синтаксисов
+
+    handlers = pydicom.config.pixel_data_handlers
+    preferred = [h for name in _GIL_RELEASING_HANDLERS for h in handlers if h.__name__.endswith(name)]
+    pydicom.config.pixel_data_handlers = preferred + [h for h in handlers if h not in preferred]
+    logger.debug(f"Порядок обработчиков пиксельных данных: {[h.__name__ for h in pydicom.config.pixel_data_handlers]}")
+
+
+def _as_float(value, default=0.0):
+    """
+    Приведение значения тега (IS/DS/строка) к float для сортировки срезов.
+    
+    Args:
+        value: Значение тега.
+        default: Значение при отсутствии или некорректном значении тега.
+        
+    Returns:
+        float: Числовое значение.
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _series_slice_order(files):
+    """
+    Порядок срезов серии по координате z (ImagePositionPatient).
+    Метаданные серии собираются в отдельные массивы (позиции (N, 3), номера экземпляров,
+    положения срезов), порядок вычисляется одним np.lexsort. Направление обхода по z
+    выбирается так, чтобы номера экземпляров шли по возрастанию, как при прежней сортировке.
+    Если хотя бы у одного среза нет корректной позиции, срезы сортируются по номеру
+    экземпляра, затем по SliceLocation. Некорректные значения тегов (NaN) уходят в конец.
+    
+    Args:
+        files: Список метаданных файлов одной серии.
+        
+    Returns:
+        numpy.ndarray: Индексы файлов в порядке срезов.
+    """
+    count = len(files)
+    positions = np.full((count, 3), np.nan, dtype=np.float64)
+    instance_numbers = np.empty(count, dtype=np.float64)
+    slice_locations = np.empty(count, dtype=np.float64)
+    malformed = 0
+    for i, file_meta in enumerate(files):
+        ds = file_meta.get('ds')
+        position = getattr(ds, 'ImagePositionPatient', None) if ds is not None else None
+        if position is not None:
+            try:
+                positions[i] = [float(v) for v in position]
+            except (TypeError, ValueError):
+                malformed += 1
+        instance_numbers[i] = _as_float(file_meta.get('instance_number'), np.nan)
+        slice_locations[i] = _as_float(file_meta.get('slice_location'), np.nan)
+    if malformed:
+        logger.warning(f"Некорректный тег ImagePositionPatient у {malformed} срезов серии")
+    
+    z = positions[:, 2]
+    if count and np.isfinite(z).all():
+        order = np.lexsort((instance_numbers, z))
+        ordered_numbers = instance_numbers[order]
+        ordered_numbers = ordered_numbers[np.isfinite(ordered_numbers)]
+        if ordered_numbers.size > 1 and ordered_numbers[0] > ordered_numbers[-1]:
+            order = order[::-1]
+        return order
+    return np.lexsort((slice_locations, instance_numbers))
+
+
+def _rescale_to_hu(pixel_data, slope, intercept):
+    """
+    Пересчет сохраненных значений в единицы Хаунсфилда.
+    При целых наклоне и смещении (типичный КТ: 1 и -1024) результат хранится в int16 -
+    вдвое меньше float32 и вчетверо меньше float64, получаемого при умножении на DS тег.
+    Дробные коэффициенты или выход за диапазон int16 дают float32.
+    
+    Args:
+        pixel_data: Сохраненные значения пикселей (pixel_array).
+        slope: RescaleSlope.
+        intercept: RescaleIntercept.
+        
+    Returns:
+        numpy.ndarray: Срез в HU (int16 или float32).
+    """
+    slope, intercept = float(slope), float(intercept)
+    if slope.is_integer() and intercept.is_integer() and pixel_data.dtype.kind in 'iu' and pixel_data.size:
+        # Диапазон проверяется по min/max исходных значений (без промежуточного массива): если в int16
+        # помещаются и исходные значения, и произведение, и результат, пересчет идет на месте в одной копии int16
+        slope, intercept = int(slope), int(intercept)
+        low, high = int(pixel_data.min()), int(pixel_data.max())
+        int16_info = np.iinfo(np.int16)
+        bounds = (low, high, low * slope, high * slope, low * slope + intercept, high * slope + intercept)
+        if int16_info.min <= min(bounds) and max(bounds) <= int16_info.max:
+            hu = pixel_data.astype(np.int16)
+            if slope != 1:
+                hu *= slope
+            if intercept:
+                hu += intercept
+            return hu
+    hu = pixel_data.astype(np.float32)
+    hu *= slope
+    hu += intercept
+    return hu
+
 
 class DicomLoader(QObject):
     """Загрузчик DICOM файлов."""
@@ -36,6 +162,8 @@ class DicomLoader(QObject):
         
         self.dicom_extensions = ['.dcm', '.dicom', '.dic', '']
         
+        _configure_pixel_data_handlers()
+        
         logger.info("Инициализирован загрузчик DICOM")
     
     def load_files(self, file_paths, recursive=False):
@@ -331,8 +459,7 @@ class DicomLoader(QObject):
             # Преобразуем серии из словаря в список и сортируем файлы в каждой серии
             series_list = []
             for series_uid, files in study_data['series'].items():
-                # Сортируем файлы по номеру экземпляра или положению среза
-                sorted_files = sorted(files, key=lambda x: (x['instance_number'], x['slice_location']))
+                sorted_files = [files[i] for i in _series_slice_order(files)]
                 
                 # Собираем информацию о серии
                 if sorted_files:
@@ -407,7 +534,7 @@ class DicomLoader(QObject):
             pixel_data = ds.pixel_array
             
             if hasattr(ds, 'RescaleSlope') and hasattr(ds, 'RescaleIntercept'):
-                pixel_data = pixel_data * ds.RescaleSlope + ds.RescaleIntercept
+                pixel_data = _rescale_to_hu(pixel_data, ds.RescaleSlope, ds.RescaleIntercept)
             
             return pixel_data
         except Exception as e:
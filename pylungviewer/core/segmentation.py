@@ -5,6 +5,7 @@
 
 import logging
 import os
+import threading
 import torch
 import segmentation_models_pytorch as smp
 import numpy as np
@@ -20,6 +21,10 @@ ENCODER = 'resnet34'
 ENCODER_WEIGHTS = None 
 CLASSES = 1
 ACTIVATION = None 
+# Число срезов в одном прямом проходе модели при сегментации объема
+BATCH_SIZE = 16
+# Вывод на GPU в половинной точности: веса и входной пакет float16 (вдвое меньше данных через PCIe)
+USE_FP16_ON_GPU = True
 
 class SegmentationSignals(QObject):
     progress = pyqtSignal(int, int) 
@@ -35,8 +40,15 @@ class LungSegmenter:
             model_path (str, optional): Путь к файлу модели (.pth). Defaults to None.
         """
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.use_fp16 = USE_FP16_ON_GPU and self.device.type == 'cuda'
+        # Тип входного пакета на стороне хоста (приводится к нему уже при ресайзе)
+        self._input_dtype = torch.float16 if self.use_fp16 else torch.float32
         self.model = None
         self.model_path = None
+        self._inference_model = None # Оптимизированная для вывода копия модели (или сама модель)
+        # Постоянные page-locked буферы пакета для копирования на GPU, свой в каждом потоке
+        # (сегментация среза и объема могут выполняться в разных потоках)
+        self._pinned = threading.local()
         self.signals = SegmentationSignals() 
         self._is_cancelled = False 
         logger.info(f"Используемое устройство для сегментации: {self.device}")
@@ -70,69 +82,180 @@ class LungSegmenter:
 
             self.model.load_state_dict(torch.load(model_path, map_location=self.device))
             self.model.to(self.device)
+            if self.use_fp16:
+                self.model.half()
             self.model.eval() 
             self.model_path = model_path
+            self._inference_model = self._build_inference_model(self.model)
             logger.info("Модель успешно загружена и переведена в режим оценки.")
             return True
         except ImportError:
              logger.error("Библиотека segmentation-models-pytorch не найдена. Установите ее: pip install segmentation-models-pytorch")
              self.model = None
              self.model_path = None
+             self._inference_model = None
              return False
         except Exception as e:
             logger.error(f"Ошибка при загрузке модели: {e}", exc_info=True)
             self.model = None
             self.model_path = None
+            self._inference_model = None
             return False
 
-    def _preprocess_slice(self, slice_hu):
+    def _build_inference_model(self, model):
         """
-        Предобработка одного среза КТ (в единицах Хаунсфилда) перед подачей в модель.
+        Подготовка модели к выводу на GPU: трассировка TorchScript, заморозка весов и
+        torch.jit.optimize_for_inference (слияние conv+bn и поэлементных операций в общие ядра).
+        На CPU и при любой ошибке оптимизации используется исходная модель.
+
+        Args:
+            model (torch.nn.Module): Загруженная модель в режиме оценки.
+
+        Returns:
+            torch.nn.Module: Модель, которую следует вызывать для предсказаний.
+        """
+        if self.device.type != 'cuda':
+            return model
+        # Форма входа фиксирована (IMG_SIZE x IMG_SIZE), поэтому автоподбор алгоритмов cuDNN
+        # выполняется один раз на первом пакете, дальше используются самые быстрые ядра.
+        # Флаг глобальный для процесса: действует на все вызовы cuDNN, не только на эту модель.
+        torch.backends.cudnn.benchmark = True
+        try:
+            example = torch.zeros((1, 1, IMG_SIZE, IMG_SIZE), dtype=self._input_dtype, device=self.device)
+            with torch.no_grad():
+                traced = torch.jit.trace(model, example)
+                optimized = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+                optimized(example) # Прогрев: компиляция слитых ядер до первого среза
+            logger.info("Модель оптимизирована для вывода на GPU (TorchScript).")
+            return optimized
+        except Exception as e:
+            logger.warning(f"Не удалось оптимизировать модель для вывода, используется исходная: {e}")
+            return model
+
+    def _preprocess_batch(self, slices_hu):
+        """
+        Предобработка пакета срезов КТ (в единицах Хаунсфилда) перед подачей в модель.
         Эта функция должна ТОЧНО повторять предобработку из скрипта обучения.
+        Тяжелая работа выполняется без GIL (ufunc numpy над числовыми массивами целиком и cv2.resize),
+        в Python остается только цикл по срезам пакета, поэтому поток GUI продолжает перерисовку
+        диалога прогресса, пока воркер готовит пакет. Поэлементные циклы в Python здесь недопустимы.
 
         Args:
-            slice_hu (np.ndarray): 2D массив среза в HU.
+            slices_hu (np.ndarray): 3D массив срезов в HU [S, H, W].
 
         Returns:
-            torch.Tensor: Обработанный тензор среза [1, 1, IMG_SIZE, IMG_SIZE]
+            torch.Tensor: Обработанный тензор [S, 1, IMG_SIZE, IMG_SIZE] (float16 при use_fp16)
                           или None в случае ошибки.
         """
         try:
-            # 1. Применение легочного окна -> [0, 1] float
+            if slices_hu.ndim != 3:
+                 logger.error(f"Неверная размерность входного пакета срезов для ресайза: {slices_hu.ndim}")
+                 return None
+
+            # 1. Применение легочного окна -> [0, 1] float, одной операцией на весь пакет (на месте)
             min_val = WINDOW_LEVEL - WINDOW_WIDTH / 2.0 
-            max_val = WINDOW_LEVEL + WINDOW_WIDTH / 2.0
-            slice_windowed = np.clip(slice_hu.astype(np.float32), min_val, max_val)
             if WINDOW_WIDTH == 0: width = 1.0
             else: width = float(WINDOW_WIDTH)
-            slice_normalized = (slice_windowed - min_val) / width
-            slice_normalized = np.clip(slice_normalized, 0.0, 1.0)
-            slice_normalized = slice_normalized.astype(np.float32)
+            slices_normalized = np.subtract(slices_hu, min_val, dtype=np.float32)
+            np.multiply(slices_normalized, 1.0 / width, out=slices_normalized)
+            np.clip(slices_normalized, 0.0, 1.0, out=slices_normalized)
+
+            # 2. Ресайз каждого среза до IMG_SIZE x IMG_SIZE с помощью OpenCV
+            # (при выводе в float16 результат ресайза приводится к нему при записи в пакет)
+            batch_tensor = self._get_host_batch(slices_normalized.shape[0])
+            batch = batch_tensor.numpy()
+            for i, slice_normalized in enumerate(slices_normalized):
+                batch[i, 0] = cv2.resize(
+                    slice_normalized,
+                    (IMG_SIZE, IMG_SIZE),
+                    interpolation=cv2.INTER_LINEAR # Линейная интерполяция для изображения
+                )
+
+            # 3. Конвертация в тензор PyTorch [S, 1, H, W] и перенос на нужное устройство
+            return batch_tensor.to(self.device, non_blocking=True)
 
-            # 2. Ресайз до IMG_SIZE x IMG_SIZE с помощью OpenCV
-            if slice_normalized.ndim != 2:
-                 logger.error(f"Неверная размерность входного среза для ресайза: {slice_normalized.ndim}")
-                 return None
+        except Exception as e:
+            logger.error(f"Ошибка при предобработке пакета срезов: {e}", exc_info=True)
+            return None
 
-            slice_resized = cv2.resize(
-                slice_normalized,
-                (IMG_SIZE, IMG_SIZE),
-                interpolation=cv2.INTER_LINEAR # Линейная интерполяция для изображения
-            )
+    def _get_host_batch(self, num_slices):
+        """
+        Буфер на стороне хоста для пакета из num_slices срезов.
+        На GPU используется постоянный page-locked (pinned) буфер на BATCH_SIZE срезов: драйвер
+        копирует из него напрямую (DMA), без промежуточной копии из pageable памяти на каждый пакет.
+        Буфер можно переиспользовать сразу: predict_batch дожидается результата (.cpu())
+        до предобработки следующего пакета, так что предыдущая копия к этому моменту завершена.
 
-            # 3. Конвертация в тензор PyTorch [C, H, W]
-            # Добавляем канал (C=1)
-            slice_tensor = torch.from_numpy(slice_resized).float().unsqueeze(0) # [1, H, W]
+        Args:
+            num_slices (int): Число срезов в пакете.
 
-            # 4. Добавление батча -> [1, 1, H, W]
-            slice_tensor = slice_tensor.unsqueeze(0)
+        Returns:
+            torch.Tensor: CPU тензор [num_slices, 1, IMG_SIZE, IMG_SIZE] типа входа модели.
+        """
+        if self.device.type != 'cuda' or num_slices > BATCH_SIZE:
+            return torch.empty((num_slices, 1, IMG_SIZE, IMG_SIZE), dtype=self._input_dtype)
+        pinned_batch = getattr(self._pinned, 'batch', None)
+        if pinned_batch is None:
+            try:
+                pinned_batch = self._pinned.batch = torch.empty((BATCH_SIZE, 1, IMG_SIZE, IMG_SIZE), dtype=self._input_dtype, pin_memory=True)
+            except Exception as e:
+                logger.warning(f"Не удалось выделить pinned память для пакета, используется обычная: {e}")
+                return torch.empty((num_slices, 1, IMG_SIZE, IMG_SIZE), dtype=self._input_dtype)
+        return pinned_batch[:num_slices]
+
+    def predict_batch(self, slices_hu, out=None):
+        """
+        Выполнение предсказания (сегментации) для пакета срезов КТ за один прямой проход модели.
 
-            # 5. Перенос на нужное устройство
-            slice_tensor = slice_tensor.to(self.device)
+        Args:
+            slices_hu (np.ndarray): 3D массив срезов в единицах Хаунсфилда [S, H, W].
+            out (np.ndarray, optional): Непрерывный буфер uint8 [S, H, W] для записи масок
+                                        (например, участок маски всего объема). Defaults to None.
 
-            return slice_tensor
+        Returns:
+            np.ndarray: Бинарные маски uint8 [S, H, W] того же размера, что и входные срезы (out, если задан),
+                        или None, если модель не загружена или произошла ошибка.
+        """
+        if self.model is None:
+            return None
+        if slices_hu is None or slices_hu.ndim != 3:
+            logger.error("Некорректные входные данные для predict_batch.")
+            return None
+
+        num_slices, height, width = slices_hu.shape
+        if out is not None and (out.shape != slices_hu.shape or out.dtype != np.uint8 or not out.flags.c_contiguous):
+            logger.error(f"Некорректный буфер для масок пакета: {out.shape}, {out.dtype}")
+            return None
+
+        input_tensor = self._preprocess_batch(slices_hu)
+        if input_tensor is None:
+            return None
+
+        try:
+            with torch.inference_mode(): # Без графа autograd и учета версий тензоров
+                output_logits = self._inference_model(input_tensor) # [S, 1, IMG_SIZE, IMG_SIZE]
+
+            # Порог и приведение к uint8 на устройстве модели: на хост копируется готовая маска
+            # (1 байт на пиксель вместо float32 логитов), без отдельного прохода astype на CPU
+            predicted_masks = (output_logits[:, 0] > 0.0).to(torch.uint8).cpu().numpy() # [S, IMG_SIZE, IMG_SIZE]
+
+            masks = out if out is not None else np.empty((num_slices, height, width), dtype=np.uint8)
+            for i, predicted_mask in enumerate(predicted_masks):
+                # Ресайз сразу в срез выходного буфера (dst), без временного массива на каждый срез
+                target = masks[i]
+                resized = cv2.resize(
+                    predicted_mask,
+                    (width, height),
+                    dst=target,
+                    interpolation=cv2.INTER_NEAREST # Ближайший сосед для маски (для бинарных масок)
+                )
+                if resized is not target:
+                    target[...] = resized
+
+            return masks
 
         except Exception as e:
-            logger.error(f"Ошибка при предобработке среза: {e}", exc_info=True)
+            logger.error(f"Ошибка во время предсказания для пакета срезов: {e}", exc_info=True)
             return None
 
     def predict(self, slice_hu):
@@ -155,37 +278,18 @@ class LungSegmenter:
              logger.error(f"Неверная размерность входного среза для predict: {slice_hu.ndim}")
              return None
 
-        original_shape = slice_hu.shape 
+        masks = self.predict_batch(slice_hu[np.newaxis])
+        return masks[0] if masks is not None else None
 
-        input_tensor = self._preprocess_slice(slice_hu)
-        if input_tensor is None:
-            return None
-
-        try:
-            with torch.no_grad(): # Отключаем расчет градиентов
-                output_logits = self.model(input_tensor) # [1, 1, IMG_SIZE, IMG_SIZE]
-
-            predicted_mask = (output_logits > 0.0).squeeze().cpu().numpy().astype(np.uint8) # [IMG_SIZE, IMG_SIZE]
-
-            mask_resized = cv2.resize(
-                predicted_mask,
-                (original_shape[1], original_shape[0]), # (width, height)
-                interpolation=cv2.INTER_NEAREST # Ближайший сосед для маски (для бинарных масок)
-            )
-
-            return mask_resized
-
-        except Exception as e:
-            logger.error(f"Ошибка во время предсказания для одного среза: {e}", exc_info=True)
-            return None
-
-    def predict_volume(self, volume_hu, is_cancelled=None):
+    def predict_volume(self, volume_hu, is_cancelled=None, on_progress=None):
         """
         Выполнение предсказания (сегментации) для всего 3D объема КТ.
 
         Args:
             volume_hu (np.ndarray): 3D массив объема в единицах Хаунсфилда [Z, H, W].
             is_cancelled (callable, optional): Функция, возвращающая True, если процесс отменен.
+            on_progress (callable, optional): Функция (обработано срезов, всего срезов), вызываемая
+                                              после каждого пакета вместо сигнала signals.progress.
 
         Returns:
             np.ndarray: 3D массив бинарных масок сегментации [Z, H, W]
@@ -201,33 +305,31 @@ class LungSegmenter:
         num_slices, height, width = volume_hu.shape
         logger.info(f"Начало сегментации объема из {num_slices} срезов...")
 
-        # Создаем пустой массив для хранения масок
-        volume_mask = np.zeros_like(volume_hu, dtype=np.uint8)
+        # Маски всего объема выделяются один раз, пакеты записываются прямо в свой участок
+        volume_mask = np.empty(volume_hu.shape, dtype=np.uint8)
         error_occurred = False
 
         # Проверяем наличие атрибута signals перед использованием
         signals_available = hasattr(self, 'signals') and self.signals is not None
 
-        for i in range(num_slices):
+        # Срезы обрабатываются пакетами по BATCH_SIZE: один прямой проход модели на пакет
+        for start in range(0, num_slices, BATCH_SIZE):
             if is_cancelled and is_cancelled():
-                 logger.info(f"Сегментация объема отменена на срезе {i}/{num_slices}.")
+                 logger.info(f"Сегментация объема отменена на срезе {start}/{num_slices}.")
                  return None 
 
-            slice_hu = volume_hu[i]
-            mask = self.predict(slice_hu)
-
-            if mask is not None:
+            stop = min(start + BATCH_SIZE, num_slices)
+            masks = self.predict_batch(volume_hu[start:stop], out=volume_mask[start:stop])
 
-                if mask.shape == (height, width):
-                    volume_mask[i] = mask
-                else:
-                    logger.warning(f"Размер маски ({mask.shape}) не совпадает с размером среза ({height}, {width}) для индекса {i}. Пропуск.")
-            else:
-                logger.warning(f"Не удалось сегментировать срез {i}. Маска будет пустой.")
+            if masks is None:
+                volume_mask[start:stop] = 0
+                logger.warning(f"Не удалось сегментировать срезы {start}-{stop - 1}. Маски будут пустыми.")
                 error_occurred = True
 
-            if signals_available and ((i + 1) % 5 == 0 or i == num_slices - 1):
-                 self.signals.progress.emit(i + 1, num_slices)
+            if on_progress is not None:
+                 on_progress(stop, num_slices)
+            elif signals_available:
+                 self.signals.progress.emit(stop, num_slices)
 
         if error_occurred:
             logger.warning("Во время сегментации объема возникли ошибки для некоторых срезов.")
@@ -56,6 +56,8 @@ class MainWindow(QMainWindow):
         self.viewer_panel.segmentation_status_update.connect(self._update_status_bar)
         # Подключаем сигнал из ViewerPanel об успешной загрузке модели
         self.viewer_panel.model_loaded_status.connect(self._on_model_loaded_status)
+        # Объем серии загружается в фоне: действия сегментации обновляются по готовности
+        self.viewer_panel.series_loaded.connect(self._on_series_loaded)
 
         # Подключаем сигнал от ViewerPanel о необходимости обновления состояния действий измерения
         self.viewer_panel.measurement_state_changed.connect(self._update_measurement_actions_state)
@@ -284,6 +286,14 @@ class MainWindow(QMainWindow):
         self._update_segmentation_actions_state()
 
 
+    @pyqtSlot(bool)
+    def _on_series_loaded(self, success):
+        """ Обрабатывает завершение фоновой загрузки объема серии в ViewerPanel. """
+        if success:
+            self._update_status_bar("Серия загружена.")
+        self._update_segmentation_actions_state()
+
+
     def _update_segmentation_actions_state(self):
         """
         Обновляет состояние действий сегментации (доступность).
@@ -436,6 +446,16 @@ class MainWindow(QMainWindow):
                 logger.info("Ожидание завершения потока сегментации перед выходом...")
                 if not self.viewer_panel.segmentation_thread.wait(5000): 
                      logger.warning("Поток сегментации не завершился вовремя.")
+        if self.viewer_panel.series_load_thread and self.viewer_panel.series_load_thread.isRunning():
+            logger.info("Остановка загрузки серии перед выходом...")
+            load_thread = self.viewer_panel.series_load_thread
+            self.viewer_panel.cancel_series_load()
+            if not load_thread.wait(5000):
+                 logger.warning("Поток загрузки серии не завершился вовремя.")
+        if self.viewer_panel.model_load_thread and self.viewer_panel.model_load_thread.isRunning():
+            logger.info("Ожидание завершения загрузки модели перед выходом...")
+            if not self.viewer_panel.model_load_thread.wait(5000):
+                 logger.warning("Поток загрузки модели не завершился вовремя.")
         if hasattr(self.sidebar_panel, 'export_worker') and self.sidebar_panel.export_worker is not None:
              if self.sidebar_panel.export_thread and self.sidebar_panel.export_thread.isRunning():
                   logger.info("Остановка потока экспорта перед выходом...")
@@ -1,19 +1,26 @@
 import logging
 import os
 import traceback
-import glob 
 import math 
+import itertools
+import ctypes
+import threading
+import tempfile
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QSlider, QPushButton, QFrame, QApplication,
     QCheckBox, QMessageBox, QProgressDialog,
     QGraphicsProxyWidget, 
-    QGraphicsItem,
+    QGraphicsItem, QGraphicsItemGroup,
     QGraphicsLineItem,
     QMenu, QAction
 )
-from PyQt5.QtCore import Qt, pyqtSignal, pyqtSlot, QEvent, QObject, QDateTime, QPointF, QThread, QTimer, QRectF, QPoint 
-from PyQt5.QtGui import QIcon, QColor, QPen, QKeyEvent, QContextMenuEvent 
+from PyQt5.QtCore import Qt, pyqtSignal, pyqtSlot, QEvent, QObject, QDateTime, QPointF, QThread, QTimer, QRectF, QPoint, QRunnable, QThreadPool 
+from PyQt5.QtGui import QIcon, QColor, QPen, QKeyEvent, QContextMenuEvent, QStaticText, QTransform 
 import pyqtgraph as pg
 
 
@@ -41,6 +48,63 @@ except ImportError as e:
 from pylungviewer.utils.window_presets import WindowPresets
 from pylungviewer.core.dicom_loader import DicomLoader
 
+# Цвет (RGB) и непрозрачность оверлея маски сегментации
+MASK_OVERLAY_RGB = (255, 0, 0)
+MASK_OVERLAY_ALPHA = 255
+# Таблица цветов оверлея: 0 - прозрачный, любое ненулевое значение - цвет маски.
+# uint8 изображение с такой таблицей отображается pyqtgraph как QImage Format_Indexed8 без конвертации в ARGB
+_MASK_OVERLAY_LUT = np.zeros((256, 4), dtype=np.uint8)
+_MASK_OVERLAY_LUT[1:] = MASK_OVERLAY_RGB + (MASK_OVERLAY_ALPHA,)
+# Таблица совмещенного изображения полной маски: индекс = яркость + 256 * маска -> RGB.
+# Строки маски повторяют наложение mask_item (CompositionMode_Plus): яркость + цвет * непрозрачность
+_FUSED_OVERLAY_LUT = np.repeat(np.arange(256, dtype=np.float32)[:, None], 3, axis=1)
+_FUSED_OVERLAY_LUT = np.concatenate(
+    (_FUSED_OVERLAY_LUT, _FUSED_OVERLAY_LUT + np.array(MASK_OVERLAY_RGB, dtype=np.float32) * (MASK_OVERLAY_ALPHA / 255.0))
+).clip(0, 255).astype(np.uint8)
+
+# Допуск попадания по линии измерения (в пикселях экрана)
+MEASUREMENT_PICK_TOLERANCE_PX = 5.0
+
+# Общее изображение-заглушка (только для чтения), показываемое при отсутствии данных
+_PLACEHOLDER_IMG = np.zeros((512, 512), dtype=np.uint8)
+_PLACEHOLDER_IMG.setflags(write=False)
+
+# Предсвязанные форматтеры подписей для горячего пути движения мыши
+_HU_FMT = "HU: {:.1f}".format
+_DISTANCE_FMT = "{:.1f} mm".format
+
+# Сколько недавно просмотренных срезов держат скрытые элементы измерений на сцене
+MEASUREMENT_SCENE_CACHE_SLICES = 8
+# Сколько недавно показанных срезов хранится уже в окне (uint8) для повторного показа без пересчета
+DISPLAY_CACHE_SLICES = 64
+# Сколько соседних срезов в каждую сторону заранее переводится в окно в фоне после смены среза
+DISPLAY_PREFETCH_SLICES = 4
+# Сколько LUT окна (по 64 КБ для int16) хранится: при перетаскивании окна каждый шаг дает новую пару центр/ширина
+WINDOW_LUT_CACHE_SIZE = 16
+
+# Число потоков чтения/декодирования срезов при загрузке серии
+SERIES_LOAD_WORKERS = min(8, os.cpu_count() or 1)
+# Максимум срезов, прочитанных заранее и ожидающих копирования в объем (ограничивает пиковую память загрузки)
+SERIES_LOAD_READAHEAD = 2 * SERIES_LOAD_WORKERS
+
+# Объемы больше этого размера размещаются в отображаемом в память временном файле (np.memmap),
+# чтобы при нехватке памяти ОС могла вытеснять неиспользуемые страницы без свопа
+SERIES_MEMMAP_THRESHOLD_BYTES = 1 << 30
+# То же для упакованной маски сегментации: к ней обращаются по одному срезу, поэтому порог ниже
+MASK_MEMMAP_THRESHOLD_BYTES = 64 << 20
+# Теги первого файла серии, нужные панели (информация о серии и Pixel Spacing); остальной заголовок не разбирается
+SERIES_INFO_TAGS = ['PatientName', 'StudyDescription', 'PixelSpacing']
+
+# Через сколько мс после кооперативной отмены прерывать зависший воркер принудительно
+SEGMENTATION_HARD_CANCEL_MS = 2000
+
+
+class SegmentationCancelledError(BaseException):
+    """
+    Исключение, внедряемое в поток воркера при принудительной отмене сегментации.
+    Наследует BaseException, чтобы обработчики except Exception в сегментаторе его не перехватывали.
+    """
+
 class SegmentationWorker(QObject):
     finished = pyqtSignal(object) 
     progress = pyqtSignal(int, int) 
@@ -51,53 +115,154 @@ class SegmentationWorker(QObject):
         self.segmenter = segmenter
         self.volume_hu = volume_hu
         self.is_cancelled = False
+        self.thread_ident = None # threading.get_ident() потока, пока в него можно внедрить отмену (см. force_cancel)
+        self._thread_ident_lock = threading.Lock() # Общий для force_cancel и снятия thread_ident в run()
+        self._force_cancel_injected = False # Исключение отмены внедряется не более одного раза
+        self._finished_emitted = False
+        self._last_progress = 0 # Последнее переданное в GUI значение прогресса
+        # Поддержка отмены и обратного вызова прогресса в predict_volume определяется один раз при создании воркера
+        predict_volume = getattr(segmenter, 'predict_volume', None)
+        predict_code = getattr(predict_volume, '__code__', None)
+        predict_args = predict_code.co_varnames if predict_code is not None else ()
+        predict_kwargs = {}
+        if 'is_cancelled' in predict_args:
+            predict_kwargs['is_cancelled'] = self._is_cancelled
+        # Прогресс передается обычным вызовом report_progress, а не через слот Qt: исключение отмены,
+        # внедренное во время вызова слота, не дошло бы до run() (PyQt5 завершает процесс при исключении в слоте)
+        self._progress_callback = 'on_progress' in predict_args
+        if self._progress_callback:
+            predict_kwargs['on_progress'] = self.report_progress
+        self._predict = partial(predict_volume, **predict_kwargs) if predict_kwargs else predict_volume
 
     def run(self):
-        """Выполняет сегментацию объема."""
-        if self.segmenter is None or self.volume_hu is None:
-            self.error.emit("Сегментатор или данные объема не инициализированы.")
-            self.finished.emit(None)
+        """
+        Выполняет сегментацию объема.
+        Внедренная force_cancel() отмена может прийти на любой границе байткода между установкой
+        и снятием thread_ident, поэтому снятие выполняется внутри внешнего try, а сигнал прогресса
+        подключается и отключается вне этого окна; finished передается один раз, уже после снятия.
+        """
+        signals_connected = self._connect_progress()
+        result = None
+        try:
+            try:
+                with self._thread_ident_lock:
+                    self.thread_ident = threading.get_ident()
+                result = self._run()
+            finally:
+                self._disarm_force_cancel()
+        except SegmentationCancelledError:
+            # Исключение могло прийти в finally до снятия thread_ident
+            self._disarm_force_cancel()
+            logger.info("Сегментация прервана принудительно.")
+        if signals_connected:
+            try:
+                self.segmenter.signals.progress.disconnect(self.progress)
+            except (TypeError, AttributeError):
+                pass
+        self._emit_finished(result)
+
+    def _disarm_force_cancel(self):
+        """
+        Снимает thread_ident под блокировкой и сбрасывает еще не доставленное исключение отмены:
+        после этого force_cancel() уже не может прервать поток.
+        """
+        with self._thread_ident_lock:
+            if self.thread_ident is None:
+                return
+            ident = self.thread_ident
+            self.thread_ident = None
+            ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(ident), None)
+
+    def _emit_finished(self, result):
+        """Передает результат, если он еще не был передан."""
+        if self._finished_emitted:
             return
+        self._finished_emitted = True
+        self.finished.emit(result)
 
-        signals_connected = False
-        if hasattr(self.segmenter, 'signals'):
-            try:
-                if hasattr(self.segmenter.signals, 'progress'):
-                    self.segmenter.signals.progress.connect(self.report_progress)
-                    signals_connected = True
-                else:
-                    logger.warning("Атрибут 'progress' не найден у объекта segmenter.signals.")
-            except (AttributeError, TypeError):
-                 logger.warning("Не удалось подключить сигнал прогресса сегментатора.")
+    def _connect_progress(self):
+        """
+        Для сегментатора без обратного вызова прогресса подключает его сигнал progress напрямую
+        к сигналу progress воркера (передача сигнала в C++, без вызова Python слота в потоке воркера).
 
+        Returns:
+            True, если сигнал подключен.
+        """
+        if self._progress_callback or self.segmenter is None or not hasattr(self.segmenter, 'signals'):
+            return False
         try:
-            # Передаем флаг отмены в predict_volume, если он поддерживает
-            if hasattr(self.segmenter, 'predict_volume') and hasattr(self.segmenter.predict_volume, '__code__') and 'is_cancelled' in self.segmenter.predict_volume.__code__.co_varnames:
-                 result = self.segmenter.predict_volume(self.volume_hu, is_cancelled=lambda: self.is_cancelled)
-            else:
-                 result = self.segmenter.predict_volume(self.volume_hu)
+            if hasattr(self.segmenter.signals, 'progress'):
+                self.segmenter.signals.progress.connect(self.progress)
+                return True
+            logger.warning("Атрибут 'progress' не найден у объекта segmenter.signals.")
+        except (AttributeError, TypeError):
+             logger.warning("Не удалось подключить сигнал прогресса сегментатора.")
+        return False
+
+    def _run(self):
+        """
+        Сегментирует объем и упаковывает маску.
+
+        Returns:
+            PackedMaskVolume или None при ошибке/отмене.
+        """
+        if self.segmenter is None or self.volume_hu is None:
+            self.error.emit("Сегментатор или данные объема не инициализированы.")
+            return None
+
+        try:
+            # Флаг отмены передается в predict_volume, если он поддерживается (см. __init__)
+            result = self._predict(self.volume_hu)
 
             if not self.is_cancelled: # Проверяем флаг отмены еще раз после выполнения
-                self.finished.emit(result)
-            else:
-                logger.info("Сегментация отменена воркером, результат не передается.")
-                self.finished.emit(None)
+                # Упаковка маски в биты выполняется здесь, а не в потоке GUI; полный uint8 объем освобождается сразу
+                if result is not None:
+                    result = PackedMaskVolume(result)
+                return result
+            logger.info("Сегментация отменена воркером, результат не передается.")
+            return None
+        except SegmentationCancelledError:
+            raise
         except Exception as e:
             logger.error(f"Ошибка в потоке сегментации: {e}", exc_info=True)
             self.error.emit(f"Ошибка во время сегментации: {e}")
-            self.finished.emit(None)
-        finally:
-             # Отключаем сигнал прогресса сегментатора
-             if signals_connected and hasattr(self.segmenter, 'signals') and hasattr(self.segmenter.signals, 'progress'):
-                 try:
-                     self.segmenter.signals.progress.disconnect(self.report_progress)
-                 except (TypeError, AttributeError):
-                     pass
+            return None
+
+    def _is_cancelled(self):
+        return self.is_cancelled
 
     def report_progress(self, current, total):
-        """Передает сигнал прогресса от сегментатора."""
-        if not self.is_cancelled:
-            self.progress.emit(current, total)
+        """
+        Передает прогресс сегментатора (обратный вызов on_progress из predict_volume) в поток GUI,
+        не чаще чем на каждый 1% объема (и всегда для последнего среза).
+        """
+        if self.is_cancelled:
+            return
+        if current < total and current - self._last_progress < max(1, total // 100):
+            return
+        self._last_progress = current
+        self.progress.emit(current, total)
+
+    def force_cancel(self) -> bool:
+        """
+        Внедряет SegmentationCancelledError в поток, выполняющий run() (не более одного раза).
+        Исключение доставляется только при возврате в байткод Python, то есть прерывает код
+        сегментатора между вызовами, но не длительный вызов в C/PyTorch.
+
+        Returns:
+            True, если исключение было внедрено.
+        """
+        with self._thread_ident_lock:
+            ident = self.thread_ident
+            if ident is None or self._force_cancel_injected:
+                return False
+            count = ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(ident), ctypes.py_object(SegmentationCancelledError))
+            if count > 1:
+                # Исключение попало в несколько потоков - откатываем
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(ident), None)
+                return False
+            self._force_cancel_injected = count == 1
+            return self._force_cancel_injected
 
     def cancel(self):
         """Устанавливает флаг отмены для воркера."""
@@ -108,6 +273,452 @@ class SegmentationWorker(QObject):
              self.segmenter.cancel()
 
 
+class ModelLoadWorker(QObject):
+    """Воркер для загрузки модели сегментации в фоновом потоке."""
+    finished = pyqtSignal(bool, str) # (успех, текст ошибки)
+
+    def __init__(self, segmenter: LungSegmenter, model_path: str):
+        super().__init__()
+        self.segmenter = segmenter
+        self.model_path = model_path
+
+    def run(self):
+        """Загружает модель и сообщает результат."""
+        try:
+            success = self.segmenter.load_model(self.model_path)
+            self.finished.emit(bool(success), "")
+        except Exception as e:
+            logger.error(f"Исключение при автоматической загрузке модели: {e}", exc_info=True)
+            self.finished.emit(False, str(e))
+
+
+def _allocate_volume(shape, dtype, memmap_threshold=SERIES_MEMMAP_THRESHOLD_BYTES):
+    """
+    Выделяет массив объема. Массивы больше memmap_threshold байт размещаются в анонимном временном файле
+    через np.memmap: файл удаляется системой при освобождении отображения, а страницы может вытеснять ОС.
+    """
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    if nbytes <= memmap_threshold:
+        return np.empty(shape, dtype=dtype)
+    try:
+        with tempfile.TemporaryFile(prefix='pylungviewer_volume_') as backing_file:
+            volume = np.memmap(backing_file, dtype=dtype, mode='w+', shape=shape)
+        logger.info(f"Объем {nbytes / 2**20:.0f} МБ размещен в отображаемом в память временном файле.")
+        return volume
+    except (OSError, ValueError) as e:
+        logger.warning(f"Не удалось создать временный файл для объема, используется память: {e}")
+        return np.empty(shape, dtype=dtype)
+
+
+class SeriesLoaderWorker(QObject):
+    """Воркер для чтения пиксельных данных серии в объем в фоновом потоке."""
+    finished = pyqtSignal(object, object) # (объем HU или None, первый Dataset без пикселей или None)
+    preview_ready = pyqtSignal(object) # Срез HU, который будет показан первым (до загрузки всего объема)
+    progress = pyqtSignal(int, int)
+    error = pyqtSignal(str)
+
+    def __init__(self, dicom_loader: DicomLoader, files: list):
+        super().__init__()
+        self.dicom_loader = dicom_loader
+        self.files = files
+        self.is_cancelled = False
+
+    def run(self):
+        """Загружает срезы в заранее выделенный объем и сообщает результат."""
+        try:
+            loaded = self._load_volume()
+            if loaded is None:
+                self.finished.emit(None, None)
+                return
+            volume_hu, first_ds = loaded
+            self.finished.emit(volume_hu, first_ds)
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке объема серии: {e}", exc_info=True)
+            self.error.emit(str(e))
+            self.finished.emit(None, None)
+
+    def _read_series_info(self):
+        """Читает из первого файла серии только теги для информационной строки (без пикселей)."""
+        try:
+            return pydicom.dcmread(self.files[0].get('file_path'), force=True, stop_before_pixels=True, specific_tags=SERIES_INFO_TAGS)
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать первый DICOM файл для информации: {e}")
+            return None
+
+    def _load_volume(self):
+        files = self.files
+        slice_count = len(files)
+        volume_hu = None
+        loaded_count = 0
+        load_pixel_data = self.dicom_loader.load_pixel_data
+
+        # Срез, который панель покажет первым (середина серии), читается раньше остальных,
+        # чтобы изображение появилось через время загрузки одного среза, а не всего объема
+        preview_index = slice_count // 2
+        preview = load_pixel_data(files[preview_index])
+        if preview is not None and not self.is_cancelled:
+            self.preview_ready.emit(preview)
+
+        # Чтение и декодирование срезов выполняется параллельно: предполагается, что декодеры освобождают GIL
+        # (numpy для несжатых данных, pylibjpeg/gdcm для сжатых - см. _configure_pixel_data_handlers в DicomLoader).
+        # Задачи ставятся скользящим окном: в памяти одновременно не больше SERIES_LOAD_READAHEAD
+        # прочитанных срезов помимо объема, даже если декодирование опережает копирование.
+        with ThreadPoolExecutor(max_workers=SERIES_LOAD_WORKERS) as executor:
+            # Теги для информационной строки читаются в том же пуле, параллельно со срезами
+            info_future = executor.submit(self._read_series_info)
+            pending = deque()
+            next_index = 0
+            for i, file_meta in enumerate(files):
+                while next_index < slice_count and len(pending) < SERIES_LOAD_READAHEAD:
+                     if next_index != preview_index:
+                          pending.append(executor.submit(load_pixel_data, files[next_index]))
+                     else:
+                          pending.append(None)
+                     next_index += 1
+                future = pending.popleft()
+                if future is None:
+                     pixel_data, preview = preview, None
+                else:
+                     pixel_data = future.result()
+                if self.is_cancelled:
+                     for future in pending:
+                          if future is not None:
+                               future.cancel()
+                     logger.info("Загрузка серии отменена.")
+                     return None
+                self.progress.emit(i + 1, slice_count)
+                if pixel_data is None:
+                     logger.warning(f"Не удалось загрузить пиксельные данные для файла: {file_meta.get('file_path', 'N/A')}")
+                     continue 
+
+                if volume_hu is None:
+                     # Объем выделяется один раз по форме и типу первого успешно загруженного среза
+                     volume_hu = _allocate_volume((slice_count,) + pixel_data.shape, pixel_data.dtype)
+                elif pixel_data.shape != volume_hu.shape[1:]:
+                     logger.warning(f"Размер среза {pixel_data.shape} не совпадает с размером серии {volume_hu.shape[1:]}, пропуск: {file_meta.get('file_path', 'N/A')}")
+                     continue
+                elif pixel_data.dtype != volume_hu.dtype:
+                     if volume_hu.dtype.kind in 'iu' and pixel_data.dtype.kind == 'f':
+                          # Срез с дробными HU в целочисленном объеме: насыщение вместо переполнения
+                          dtype_info = np.iinfo(volume_hu.dtype)
+                          pixel_data = np.clip(np.rint(pixel_data), dtype_info.min, dtype_info.max)
+                     pixel_data = pixel_data.astype(volume_hu.dtype, copy=False)
+
+                # Прямое копирование среза в заранее выделенный объем (без промежуточного списка и np.stack)
+                volume_hu[loaded_count] = pixel_data
+                loaded_count += 1
+
+        if loaded_count == 0:
+             logger.error("Не удалось загрузить пиксельные данные ни для одного среза в серии.")
+             raise RuntimeError("Не удалось загрузить данные серии.")
+
+        logger.info(f"Объем загружен. Форма: {(loaded_count,) + volume_hu.shape[1:]}")
+        return (volume_hu if loaded_count == slice_count else volume_hu[:loaded_count]), info_future.result()
+
+    def cancel(self):
+        """Устанавливает флаг отмены для воркера."""
+        self.is_cancelled = True
+
+
+class SegmentationCancelTask(QRunnable):
+    """Задача отмены сегментации, выполняемая вне GUI потока."""
+
+    def __init__(self, worker: SegmentationWorker, thread: QThread):
+        super().__init__()
+        self.worker = worker
+        self.thread = thread
+
+    def run(self):
+        """Выставляет флаг отмены воркера и завершает цикл событий потока."""
+        try:
+            if self.worker is not None:
+                self.worker.cancel()
+            if self.thread is not None and self.thread.isRunning():
+                 logger.info("Завершаем поток сегментации...")
+                 self.thread.quit()
+        except RuntimeError:
+            pass # Воркер или поток уже удалены
+
+
+class SingleSliceSegmentationSignals(QObject):
+    finished = pyqtSignal(object, object) # запрос (поколение серии, индекс среза, номер запроса), маска или None
+    error = pyqtSignal(object, str)
+
+
+class SingleSliceSegmentationTask(QRunnable):
+    """Сегментация одного среза вне GUI потока (без диалога прогресса)."""
+
+    def __init__(self, segmenter: LungSegmenter, slice_hu: np.ndarray, signals, request):
+        super().__init__()
+        self.segmenter = segmenter
+        self.slice_hu = slice_hu
+        self.signals = signals
+        self.request = request
+
+    def run(self):
+        """Выполняет предсказание для среза и передает маску панели."""
+        try:
+            mask = self.segmenter.predict(self.slice_hu)
+        except Exception as e:
+            logger.error(f"Исключение при сегментации среза: {e}", exc_info=True)
+            self.signals.error.emit(self.request, str(e))
+            return
+        self.signals.finished.emit(self.request, mask)
+
+
+class DisplayPrefetchSignals(QObject):
+    slices_ready = pyqtSignal(int, object) # поколение запроса, [((индекс, центр, ширина), срез uint8)]
+
+
+class DisplayPrefetchTask(QRunnable):
+    """Фоновый перевод в окно соседних срезов для кэша отображения ViewerPanel."""
+
+    def __init__(self, signals, generation, current_generation, volume_hu, indices, window_center, window_width, lut=None):
+        super().__init__()
+        self.signals = signals
+        self.generation = generation
+        self.current_generation = current_generation
+        self.volume_hu = volume_hu
+        self.indices = indices
+        self.window_center = window_center
+        self.window_width = window_width
+        self.lut = lut # LUT окна из кэша панели или None (тогда WindowPresets.apply_window)
+
+    def run(self):
+        """Переводит срезы в окно, пока запрос актуален (панель не перешла на другой срез)."""
+        results = []
+        lut = self.lut
+        unsigned_dtype = self.volume_hu.dtype.str.replace('i', 'u')
+        for index in self.indices:
+            if self.current_generation() != self.generation:
+                return
+            if lut is not None:
+                display = np.take(lut, np.ascontiguousarray(self.volume_hu[index]).view(unsigned_dtype), mode='clip')
+            else:
+                display = WindowPresets.apply_window(self.volume_hu[index], self.window_center, self.window_width)
+            results.append(((index, self.window_center, self.window_width), display))
+        try:
+            self.signals.slices_ready.emit(self.generation, results)
+        except RuntimeError:
+            pass # Панель уже удалена
+
+
+# Таблица распаковки байта в 8 бит (старший бит первым, как np.packbits) для np.take(..., out=)
+_UNPACK_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1)
+
+
+class PackedMaskVolume:
+    """
+    Бинарная маска объема (Z, H, W), упакованная np.packbits по 8 вокселей в байт вдоль W.
+    Индексация по срезу возвращает распакованный срез uint8 (H, W) только для чтения,
+    поэтому для потребителей (оверлей, экспорт) объект ведет себя как 3D массив маски.
+    """
+
+    def __init__(self, volume):
+        volume = np.asarray(volume)
+        self.shape = volume.shape
+        self.dtype = np.dtype(np.uint8)
+        # Упаковка по срезам в заранее выделенный C-непрерывный массив: без временного булева объема
+        # (Z, H, W), а срез self._packed[z] - непрерывное представление без копирования.
+        # Для целых и булевых масок packbits сам считает ненулевые значения единицами.
+        self._packed = _allocate_volume(self.shape[:-1] + ((self.shape[-1] + 7) // 8,), np.uint8, MASK_MEMMAP_THRESHOLD_BYTES)
+        needs_compare = volume.dtype.kind not in 'biu'
+        for z in range(self.shape[0]):
+            slice_mask = volume[z]
+            self._packed[z] = np.packbits(slice_mask != 0 if needs_compare else slice_mask, axis=-1)
+        self._last_slice = (None, None) # (индекс, распакованный срез) последнего обращения
+        # Постоянный буфер распаковки для отображения (H, W с дополнением до кратного 8)
+        self._view_buf = None
+        self._last_view = (None, None)
+
+    @property
+    def nbytes(self):
+        return self._packed.nbytes
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        last_index, last_slice = self._last_slice
+        if last_index == index:
+            return last_slice
+        slice_mask = np.unpackbits(self._packed[index], axis=-1, count=self.shape[-1])
+        slice_mask.setflags(write=False)
+        self._last_slice = (index, slice_mask)
+        return slice_mask
+
+    def slice_view(self, index):
+        """
+        Распаковывает срез в постоянный буфер без выделения памяти (для потока GUI).
+        Возвращаемый массив перезаписывается при запросе другого среза; для хранения используйте [index].
+
+        Args:
+            index (int): Индекс среза.
+
+        Returns:
+            np.ndarray: Срез маски uint8 (H, W) только для чтения.
+        """
+        last_index, last_view = self._last_view
+        if last_index == index:
+            return last_view
+        packed_slice = self._packed[index]
+        if self._view_buf is None:
+            self._view_buf = np.empty(packed_slice.shape + (8,), dtype=np.uint8)
+        np.take(_UNPACK_BITS, packed_slice, axis=0, out=self._view_buf, mode='clip')
+        view = self._view_buf.reshape(packed_slice.shape[0], -1)[:, :self.shape[-1]]
+        view.setflags(write=False)
+        self._last_view = (index, view)
+        return view
+
+
+class MeasurementRecord:
+    """
+    Данные одного измерения.
+    Во время рисования хранит временные линию и подпись (line, text),
+    после завершения - id, концы отрезка, подпись и ее позицию.
+    """
+    __slots__ = ('id', 'points', 'label', 'text_pos', 'line', 'text')
+
+    def __init__(self, line=None, text=None):
+        self.id = None
+        self.points = None # (x1, y1, x2, y2) в пикселях изображения
+        self.label = None
+        self.text_pos = None # (x, y) в пикселях изображения
+        self.line = line
+        self.text = text
+
+
+class MeasurementLabelsItem(pg.GraphicsObject):
+    """
+    Подписи всех измерений среза в одном элементе сцены.
+    Текст подготавливается один раз как QStaticText и рисуется в пикселях экрана
+    (без масштабирования при зуме, как pg.TextItem) с полупрозрачным фоном.
+    """
+    PADDING_PX = 2.0
+
+    def __init__(self):
+        super().__init__()
+        self._labels = {} # id измерения -> (QPointF позиция в пикселях изображения, QStaticText)
+        # Параллельные массивы (пересобираются только при изменении набора подписей) для векторной отрисовки
+        self._anchors = np.empty((0, 2), dtype=np.float64) # Точки привязки (x, y) в пикселях изображения
+        self._half_sizes = np.empty((0, 2), dtype=np.float64) # Половина размера текста в пикселях экрана
+        self._static_texts = []
+        self._anchor_rect = QRectF() # Прямоугольник, охватывающий точки привязки подписей
+        self._max_text_size = (0.0, 0.0) # Максимальный размер подписи в пикселях экрана (с отступами)
+        self._text_pen = pg.mkPen('white')
+        self._font = QApplication.font()
+        self._fill_brush = pg.mkBrush(0, 0, 0, 100)
+
+    def set_labels(self, labels):
+        """
+        Заменяет все подписи.
+
+        Args:
+            labels (iterable): Кортежи (id, текст, (x, y)).
+        """
+        self.prepareGeometryChange()
+        make_static_text = self._make_static_text
+        self._labels = {label_id: (QPointF(*pos), make_static_text(text)) for label_id, text, pos in labels}
+        self._update_extents()
+        self.update()
+
+    def add_label(self, label_id, text, pos):
+        """ Добавляет подпись измерения с позицией (x, y) в пикселях изображения. """
+        self.prepareGeometryChange()
+        self._labels[label_id] = (QPointF(*pos), self._make_static_text(text))
+        self._update_extents()
+        self.update()
+
+    def remove_label(self, label_id):
+        """ Удаляет подпись измерения, если она есть. """
+        if label_id in self._labels:
+            self.prepareGeometryChange()
+            del self._labels[label_id]
+            self._update_extents()
+            self.update()
+
+    def label_texts(self):
+        """ Возвращает тексты подписей. """
+        return [static_text.text() for _, static_text in self._labels.values()]
+
+    def _make_static_text(self, text):
+        static_text = QStaticText(text)
+        static_text.setTextFormat(Qt.PlainText)
+        static_text.prepare(QTransform(), self._font)
+        return static_text
+
+    def _update_extents(self):
+        """ Пересчитывает кэшированные границы (только при изменении набора подписей). """
+        if not self._labels:
+            self._static_texts = []
+            self._anchors = np.empty((0, 2), dtype=np.float64)
+            self._half_sizes = np.empty((0, 2), dtype=np.float64)
+            self._anchor_rect = QRectF()
+            self._max_text_size = (0.0, 0.0)
+            return
+        # Один проход по подписям: позиции и тексты раскладываются в параллельные последовательности
+        positions, static_texts = zip(*self._labels.values())
+        self._static_texts = list(static_texts)
+        self._anchors = np.array([(pos.x(), pos.y()) for pos in positions], dtype=np.float64)
+        sizes = np.array([(size.width(), size.height()) for size in map(QStaticText.size, static_texts)], dtype=np.float64)
+        self._half_sizes = sizes / 2.0
+        (x_min, y_min), (x_max, y_max) = self._anchors.min(axis=0), self._anchors.max(axis=0)
+        self._anchor_rect = QRectF(x_min, y_min, x_max - x_min, y_max - y_min)
+        pad = 2 * self.PADDING_PX
+        width_max, height_max = sizes.max(axis=0)
+        self._max_text_size = (width_max + pad, height_max + pad)
+
+    def viewTransformChanged(self):
+        # Размер подписей в координатах изображения зависит от масштаба вида
+        self.prepareGeometryChange()
+
+    def boundingRect(self):
+        if not self._labels:
+            return QRectF()
+        pixel_w, pixel_h = self.pixelSize()
+        margin_x = self._max_text_size[0] / 2.0 * pixel_w
+        margin_y = self._max_text_size[1] / 2.0 * pixel_h
+        return self._anchor_rect.adjusted(-margin_x, -margin_y, margin_x, margin_y)
+
+    def paint(self, painter, option, widget=None):
+        if not self._labels:
+            return
+        transform = painter.transform()
+        pad = self.PADDING_PX
+        # Аффинное преобразование всех точек привязки сразу (левый верхний угол текста в пикселях устройства)
+        anchor_x, anchor_y = self._anchors[:, 0], self._anchors[:, 1]
+        lefts = transform.m11() * anchor_x + transform.m21() * anchor_y + transform.dx() - self._half_sizes[:, 0]
+        tops = transform.m12() * anchor_x + transform.m22() * anchor_y + transform.dy() - self._half_sizes[:, 1]
+        widths = 2.0 * self._half_sizes[:, 0] + 2 * pad
+        heights = 2.0 * self._half_sizes[:, 1] + 2 * pad
+        # Отсекаем подписи за пределами области отрисовки (при увеличении большая часть вне экрана)
+        static_texts = self._static_texts
+        device = painter.device()
+        if device is not None:
+            in_view = ((lefts + widths - pad >= 0) & (lefts - pad <= device.width()) &
+                       (tops + heights - pad >= 0) & (tops - pad <= device.height()))
+            if not in_view.all():
+                visible_rows = np.flatnonzero(in_view)
+                if visible_rows.size == 0:
+                    return
+                lefts, tops, widths, heights = lefts[visible_rows], tops[visible_rows], widths[visible_rows], heights[visible_rows]
+                static_texts = [static_texts[row] for row in visible_rows.tolist()]
+        painter.save()
+        # Рисуем в пикселях устройства, чтобы текст не масштабировался вместе с изображением
+        painter.resetTransform()
+        painter.setFont(self._font)
+        painter.setPen(self._text_pen)
+        # Методы и атрибуты связываются один раз вне цикла по подписям
+        fill_brush = self._fill_brush
+        fill_rect = painter.fillRect
+        draw_static_text = painter.drawStaticText
+        for left, top, width, height, static_text in zip(lefts.tolist(), tops.tolist(), widths.tolist(), heights.tolist(), static_texts):
+            fill_rect(QRectF(left - pad, top - pad, width, height), fill_brush)
+            draw_static_text(QPointF(left, top), static_text)
+        painter.restore()
+
+
 # --- Основной класс панели ---
 class ViewerPanel(QWidget):
     """Панель просмотра DICOM изображений с поддержкой сегментации, отображением HU и измерением."""
@@ -117,26 +728,84 @@ class ViewerPanel(QWidget):
     segmentation_status_update = pyqtSignal(str)
     model_loaded_status = pyqtSignal(bool)
     measurement_state_changed = pyqtSignal(bool, bool, bool)
+    series_loaded = pyqtSignal(bool)
 
     def __init__(self, models_dir: str, dicom_loader: DicomLoader, parent=None):
         super().__init__(parent)
         self.current_series = None
+        # Число измерений по срезам и признак наличия измерений на текущем срезе (обновляется при смене среза)
+        self._measurement_counts = {}
+        self._any_on_current = False
         self.current_slice_index = 0
         self.current_pixel_data_hu = None
         self.current_volume_hu = None
         self.segmentation_mask = None 
         self.full_segmentation_mask_volume = None
+        # Метаданные полной маски (shape (Z, H, W), dtype, id) или None - снимок для горячих путей
+        self._mask_meta = None
         self.models_dir = models_dir 
+        # Постоянный буфер оверлея маски (H, W) и состояние последнего обновления оверлея
+        self._mask_buf = None
+        self._overlay_state = None
+        # LRU таблиц окна {(dtype, центр, ширина): LUT uint8} и постоянные буферы отображаемого среза
+        self._window_lut_cache = OrderedDict()
+        self._display_buf = None
+        self._display_scratch = None
+        # LRU {(индекс среза, центр, ширина): срез uint8 в окне}, очищается при смене объема
+        self._display_cache = OrderedDict()
+        # Буферы совмещенного с полной маской изображения (индексы uint16 и RGB) и признак его показа
+        self._fused_index_buf = None
+        self._fused_rgb_buf = None
+        self._overlay_fused = False
         self.dicom_loader = dicom_loader
 
         #  Переменные для инструмента измерения 
         self._measurement_mode_active = False 
         self._measurement_start_point = None
         self._current_measurement_item = None 
+        # Измерения по срезам: {индекс среза: {id измерения: MeasurementRecord}}
         self._measurements_by_slice = {} 
+        self._measurement_id_counter = itertools.count()
+        # Координаты концов измерений по срезам, массив (N, 4) [x1, y1, x2, y2],
+        # и параллельный массив (N,) id измерений для каждой строки
+        self._measurement_endpoints_by_slice = {}
+        self._measurement_ids_by_slice = {}
+        # Производная геометрия отрезков для попадания по клику: {slice_index: (start, segment, inv_len2)}
+        self._measurement_geometry_by_slice = {}
+        # Обратный индекс: id измерения -> индекс среза
+        self._measurement_slice_by_id = {}
+        # Группа графических элементов измерений (кривая и подписи) среза.
+        # При уходе со среза группа скрывается; на сцене остаются группы не более
+        # MEASUREMENT_SCENE_CACHE_SLICES недавних срезов, остальные удаляются со сцены (данные сохраняются)
+        self._measurement_groups_by_slice = {}
+        # Недавно просмотренные срезы со скрытыми группами, от давнего к последнему (LRU)
+        self._hot_slices = OrderedDict()
+        # Одна кривая на срез со всеми отрезками измерений (connect='pairs')
+        self._measurement_curves_by_slice = {}
+        # Один элемент подписей (QStaticText) на срез
+        self._measurement_labels_by_slice = {}
         self._selected_measurement_item = None 
+        # Последнее отправленное состояние measurement_state_changed
+        self._last_measurement_state = None
+        # Глубина вложенных пакетных операций: пока > 0, сигнал состояния измерений не отправляется
+        self._batch_depth = 0
+        # Отложенная отправка measurement_state_changed: быстрая серия действий (очистка, прокрутка)
+        # дает один сигнал с итоговым состоянием за проход цикла событий
+        self._measurement_state_timer = QTimer(self)
+        self._measurement_state_timer.setSingleShot(True)
+        self._measurement_state_timer.setInterval(0)
+        self._measurement_state_timer.timeout.connect(self._flush_measurement_state)
         self.pixel_spacing = (1.0, 1.0)
 
+        self.model_load_thread = None
+        self.model_load_worker = None
+        self._model_load_path = None
+        self._auto_model_path = None # Модель для автозагрузки после первого показа панели
+
+        self.series_load_thread = None
+        self.series_load_worker = None
+        self._series_load_dialog = None
+
         if SEGMENTATION_AVAILABLE:
             self.segmenter = LungSegmenter()
             self._auto_load_model()
@@ -146,11 +815,69 @@ class ViewerPanel(QWidget):
 
         self.segmentation_thread = None
         self.segmentation_worker = None
+        self._segmentation_connections = [] # QMetaObject.Connection подключений воркера/потока к панели
         self.progress_dialog = None
+        # Отдельный пул из одного потока для задач отмены, чтобы GUI не ждал воркер
+        self._cancel_pool = QThreadPool(self)
+        self._cancel_pool.setMaxThreadCount(1)
+        # Отложенное принудительное прерывание воркера после отмены; останавливается, когда воркер завершился
+        self._escalate_cancel_worker = None
+        self._escalate_cancel_timer = QTimer(self)
+        self._escalate_cancel_timer.setSingleShot(True)
+        self._escalate_cancel_timer.setInterval(SEGMENTATION_HARD_CANCEL_MS)
+        self._escalate_cancel_timer.timeout.connect(self._escalate_cancel)
+        # Фоновая подготовка соседних срезов: поколение растет при каждой смене среза,
+        # устаревшие задачи прекращаются, а их результаты отбрасываются
+        self._prefetch_generation = 0
+        self._prefetch_pool = QThreadPool(self)
+        self._prefetch_pool.setMaxThreadCount(1)
+        self._prefetch_signals = DisplayPrefetchSignals(self)
+        self._prefetch_signals.slices_ready.connect(self._on_prefetched_slices)
+        # Сегментация одного среза в фоне; запрос (поколение серии, индекс среза, номер запроса) или None,
+        # если не выполняется. Поколение серии растет в load_series, номер запроса - при каждом запуске
+        # (не id() объема: адрес освобожденного объема может достаться новой серии)
+        self._series_generation = 0
+        self._single_segmentation_counter = 0
+        self._single_segmentation_request = None
+        self._single_segmentation_pool = QThreadPool(self)
+        self._single_segmentation_pool.setMaxThreadCount(1)
+        self._single_segmentation_signals = SingleSliceSegmentationSignals(self)
+        self._single_segmentation_signals.finished.connect(self._on_single_segmentation_finished)
+        self._single_segmentation_signals.error.connect(self._on_single_segmentation_error)
 
         self.touch_start_pos = None
+        # Кэш геометрии ViewBox для позиционирования меток сторон
+        self._cached_view_geometry = None
+        # Кэш аффинного преобразования сцена -> пиксели изображения (a, b, c, d, tx, ty)
+        self._scene_to_img = None
         self._init_ui()
 
+        # Переиспользуемые буферы координат линии текущего измерения (обновляются на месте при движении мыши)
+        self._line_x = np.empty(2, dtype=np.float64)
+        self._line_y = np.empty(2, dtype=np.float64)
+        # (x, y, измерение) последнего обновления текущего измерения - линия и подпись не перестраиваются на том же пикселе
+        self._last_measure_key = None
+
+        # Таймер-коалесцер событий движения мыши: обрабатываем не чаще одного раза за кадр (~60 Гц)
+        self._pending_hover_pos = None
+        self._hover_timer = QTimer(self)
+        self._hover_timer.setSingleShot(True)
+        self._hover_timer.setInterval(16)
+        self._hover_timer.timeout.connect(self._flush_hover)
+
+        # Таймер-коалесцер смены среза: при перетаскивании слайдера срез отображается не чаще раза за кадр (~60 Гц)
+        self._pending_slice = None
+        self._slice_timer = QTimer(self)
+        self._slice_timer.setSingleShot(True)
+        self._slice_timer.setInterval(16)
+        self._slice_timer.timeout.connect(self._flush_slice)
+
+        # Отложенное обновление состояния кнопок сегментации и оверлея маски: серия изменений -> одно обновление
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(0)
+        self._refresh_timer.timeout.connect(self._do_refresh)
+
         self.graphics_widget.setMouseTracking(True)
         self.graphics_widget.scene().sigMouseMoved.connect(self._on_mouse_moved)
         self.view_box.scene().sigMouseClicked.connect(self._on_view_box_clicked)
@@ -190,20 +917,8 @@ class ViewerPanel(QWidget):
         global_pos = self.mapToGlobal(pos) 
 
         click_pos_scene = self.graphics_widget.mapToScene(pos) 
-        # Проверяем, есть ли элементы сцены под курсоом
-        items_at_pos = self.view_box.scene().items(click_pos_scene)
-        logger.debug(f"Items at right-click position: {items_at_pos}")
-
-        selected_measurement = None
-        # Проходим по всем элементам под курсором
-        for item in items_at_pos:
-             current_slice_measurements = self._measurements_by_slice.get(self.current_slice_index, [])
-             for measurement in current_slice_measurements:
-                  if item == measurement['line']:
-                       selected_measurement = measurement
-                       break # Нашли совпадение, выбираем его
-             if selected_measurement:
-                  break # Прекращаем поиск по элементам, если измерение найдено
+        # Ищем измерение под курсором
+        selected_measurement = self._find_measurement_at(click_pos_scene)
 
         # Снимаем выделение с предыдущего, если оно было
         self._deselect_measurement()
@@ -213,8 +928,7 @@ class ViewerPanel(QWidget):
         if selected_measurement:
             # Если клик правой кнопкой мыши попал по измерению
             logger.debug("Правый клик по измерению. Выделяем и показываем меню удаления.")
-            self._selected_measurement_item = selected_measurement
-            self._selected_measurement_item['line'].setPen(pg.mkPen('cyan', width=3)) # Визуально выделяем
+            self._select_measurement(selected_measurement) # Визуально выделяем
             delete_action = QAction("Удалить измерение", self)
             delete_action.triggered.connect(self._delete_selected_measurement)
             context_menu.addAction(delete_action)
@@ -233,35 +947,52 @@ class ViewerPanel(QWidget):
 
         logger.info(f"Запуск сегментации для среза {self.current_slice_index + 1}...")
         self.segmentation_status_update.emit(f"Сегментация среза {self.current_slice_index + 1}...")
-        QApplication.setOverrideCursor(Qt.WaitCursor)
-        try:
-            self.full_segmentation_mask_volume = None
-            single_mask = self.segmenter.predict(self.current_pixel_data_hu)
-
-            if single_mask is not None:
-                logger.info("Сегментация среза завершена успешно.")
-                self.segmentation_mask = single_mask
-                self.segment_checkbox.setChecked(True) 
-                self._update_mask_overlay() 
-                self.segmentation_status_update.emit(f"Сегментация среза {self.current_slice_index + 1} завершена.")
-            else:
-                logger.error("Сегментация среза не удалась.")
-                QMessageBox.critical(self, "Ошибка сегментации", "Не удалось выполнить сегментацию среза.")
-                # Сбрасываем маску и деактивируем чекбокс
-                self.segmentation_mask = None
-                self.segment_checkbox.setChecked(False)
-                self._update_mask_overlay() # Скрываем оверлей
-                self.segmentation_status_update.emit("Ошибка сегментации среза.")
-        except Exception as e:
-             logger.error(f"Исключение при сегментации среза: {e}", exc_info=True)
-             QMessageBox.critical(self, "Ошибка сегментации", f"Произошла ошибка при сегментации среза:\n{str(e)}")
-             self.segmentation_mask = None
-             self.segment_checkbox.setChecked(False)
-             self._update_mask_overlay()
-             self.segmentation_status_update.emit("Ошибка сегментации среза.")
-        finally:
-            QApplication.restoreOverrideCursor()
-            self._update_segmentation_controls_state()
+        # Предсказание выполняется в пуле потоков, интерфейс остается отзывчивым;
+        # кнопки сегментации отключены до получения результата
+        self._set_full_mask_volume(None)
+        self._single_segmentation_counter += 1
+        request = (self._series_generation, self.current_slice_index, self._single_segmentation_counter)
+        self._single_segmentation_request = request
+        self._set_segmentation_controls_enabled(False)
+        self._single_segmentation_pool.start(SingleSliceSegmentationTask(
+            self.segmenter, self.current_pixel_data_hu, self._single_segmentation_signals, request))
+
+    @pyqtSlot(object, object)
+    def _on_single_segmentation_finished(self, request, single_mask):
+        """ Применяет маску, полученную фоновой сегментацией среза, если срез и серия не сменились. """
+        if request != self._single_segmentation_request:
+            return
+        self._single_segmentation_request = None
+        slice_number = request[1] + 1
+        if request[:2] != (self._series_generation, self.current_slice_index):
+            logger.info(f"Результат сегментации среза {slice_number} не применен: отображается другой срез.")
+            self.segmentation_status_update.emit(f"Сегментация среза {slice_number} отменена (срез сменился).")
+        elif single_mask is not None:
+            logger.info("Сегментация среза завершена успешно.")
+            self.segmentation_mask = np.asarray(single_mask, dtype=np.uint8)
+            self.segment_checkbox.setChecked(True) 
+            self.segmentation_status_update.emit(f"Сегментация среза {slice_number} завершена.")
+        else:
+            logger.error("Сегментация среза не удалась.")
+            QMessageBox.critical(self, "Ошибка сегментации", "Не удалось выполнить сегментацию среза.")
+            # Сбрасываем маску и деактивируем чекбокс
+            self.segmentation_mask = None
+            self.segment_checkbox.setChecked(False)
+            self.segmentation_status_update.emit("Ошибка сегментации среза.")
+        # Кнопки и оверлей обновляются одним отложенным обновлением
+        self._refresh_timer.start()
+
+    @pyqtSlot(object, str)
+    def _on_single_segmentation_error(self, request, error_message):
+        """ Обрабатывает исключение фоновой сегментации среза. """
+        if request != self._single_segmentation_request:
+            return
+        self._single_segmentation_request = None
+        QMessageBox.critical(self, "Ошибка сегментации", f"Произошла ошибка при сегментации среза:\n{error_message}")
+        self.segmentation_mask = None
+        self.segment_checkbox.setChecked(False)
+        self.segmentation_status_update.emit("Ошибка сегментации среза.")
+        self._refresh_timer.start()
 
 
     @pyqtSlot()
@@ -291,14 +1022,18 @@ class ViewerPanel(QWidget):
         self.segmentation_thread = QThread(self)
         self.segmentation_worker = SegmentationWorker(self.segmenter, self.current_volume_hu)
         self.segmentation_worker.moveToThread(self.segmentation_thread)
-        self.segmentation_worker.progress.connect(self._on_full_segmentation_progress)
-        self.segmentation_worker.finished.connect(self._on_full_segmentation_finished)
-        self.segmentation_worker.error.connect(self._on_segmentation_error)
-        self.segmentation_thread.started.connect(self.segmentation_worker.run)
-        # Подключаем finished потока для очистки ссылок
+        # Подключения к слотам панели запоминаются для отключения в _clear_segmentation_thread_refs;
+        # deleteLater остаются подключенными, чтобы поток и воркер удалились сами
+        self._segmentation_connections = [
+            self.segmentation_worker.progress.connect(self._on_full_segmentation_progress),
+            self.segmentation_worker.finished.connect(self._on_full_segmentation_finished),
+            self.segmentation_worker.error.connect(self._on_segmentation_error),
+            self.segmentation_thread.started.connect(self.segmentation_worker.run),
+            # Подключаем finished потока для очистки ссылок
+            self.segmentation_thread.finished.connect(self._clear_segmentation_thread_refs),
+        ]
         self.segmentation_thread.finished.connect(self.segmentation_thread.deleteLater)
         self.segmentation_worker.finished.connect(self.segmentation_worker.deleteLater)
-        self.segmentation_thread.finished.connect(self._clear_segmentation_thread_refs)
         self.segmentation_thread.start()
 
 
@@ -345,16 +1080,31 @@ class ViewerPanel(QWidget):
 
         self.graphics_widget.ci.layout.setRowStretchFactor(0, 10)
 
-        self.img_item = pg.ImageItem()
+        # Срез отображается в порядке строк (H, W) из постоянного буфера, без транспонирования на каждый кадр
+        self.img_item = pg.ImageItem(axisOrder='row-major')
         self.view_box.addItem(self.img_item) 
 
-        self.mask_item = pg.ImageItem()
+        # Маска отображается в порядке строк (H, W) из постоянного буфера с индексной таблицей цветов:
+        # pyqtgraph оборачивает uint8 буфер в QImage Format_Indexed8 без копирования. Таблица задается
+        # один раз - при смене данных передаются только сами данные
+        self.mask_item = pg.ImageItem(axisOrder='row-major')
+        self.mask_item.setLookupTable(_MASK_OVERLAY_LUT)
         self.mask_item.setCompositionMode(pg.QtGui.QPainter.CompositionMode_Plus)
-        lut = np.array([[0, 0, 0, 0], [255, 0, 0, 255]], dtype=np.uint8) 
-        self.mask_item.setLookupTable(lut)
         self.mask_item.setVisible(False)
         self.view_box.addItem(self.mask_item) 
 
+        # Общий слой графики измерений в координатах изображения. Группы срезов и временные элементы
+        # добавляются/удаляются в нем, а не в childGroup, поэтому ViewBox не получает itemsChanged
+        # и не ставит пересчет автомасштаба при показе/скрытии измерений
+        self._measurement_layer = QGraphicsItemGroup()
+        self._measurement_layer.setParentItem(self.view_box.childGroup)
+
+        # Подсветка выбранного измерения поверх кривой отрезков среза (вне addedItems, не влияет на автомасштаб)
+        self._selection_curve = pg.PlotCurveItem(pen=pg.mkPen('cyan', width=3))
+        self._selection_curve.setZValue(10)
+        self._selection_curve.setVisible(False)
+        self._selection_curve.setParentItem(self._measurement_layer)
+
         # Добавляем метки сторон (A, P, R, L) 
         label_style = "font-size: 16pt; font-weight: medium; color: white; background-color: transparent;" # Стиль меток
         self.label_a = QLabel("A")
@@ -387,7 +1137,14 @@ class ViewerPanel(QWidget):
         self.proxy_l.setZValue(100)
         self.proxy_r.setZValue(100)
 
+        # Размеры меток (ширина, высота) в порядке A, P, L, R; текст меток не меняется, поэтому кэшируются один раз
+        self._side_label_sizes = tuple((proxy.size().width(), proxy.size().height())
+                                       for proxy in (self.proxy_a, self.proxy_p, self.proxy_l, self.proxy_r))
+
         self.view_box.sigRangeChanged.connect(self._update_side_label_positions)
+        # Преобразование сцена -> изображение меняется при зуме/панорамировании и изменении геометрии ViewBox
+        self.view_box.sigTransformChanged.connect(self._invalidate_scene_to_img)
+        self.view_box.geometryChanged.connect(self._invalidate_scene_to_img)
 
         bottom_panel = QWidget()
         bottom_layout = QVBoxLayout(bottom_panel)
@@ -475,69 +1232,53 @@ class ViewerPanel(QWidget):
         if self.view_box is None or self.img_item is None:
             return
 
-        view_range = self.view_box.viewRange()
-        x_min_data, x_max_data = view_range[0]
-        y_min_data, y_max_data = view_range[1]
-
-        # Получаем размеры изображения в координатах данных
-        img_bounds_data = self.img_item.boundingRect()
-        img_x_data = img_bounds_data.x()
-        img_y_data = img_bounds_data.y()
-        img_width_data = img_bounds_data.width()
-        img_height_data = img_bounds_data.height()
-
-        # Получаем текущие размеры ViewBox в координатах сцены (пикселях экрана)
-        view_rect_scene = self.view_box.mapRectToScene(self.view_box.viewRect())
-        view_width_scene = view_rect_scene.width()
-        view_height_scene = view_rect_scene.height()
-
-        # Получаем размеры меток в пикселях экрана
-        label_a_size = self.proxy_a.size()
-        label_p_size = self.proxy_p.size()
-        label_l_size = self.proxy_l.size()
-        label_r_size = self.proxy_r.size()
-
-        # Рассчитываем небольшой отступ от края в пикселях экрана
-        offset_pixels = 10 
-
-
-        center_x_scene = view_rect_scene.x() + view_width_scene / 2
-
-        top_y_scene = view_rect_scene.y() + offset_pixels
-
-        pos_a_scene = QPointF(center_x_scene - label_a_size.width() / 2, top_y_scene)
-
-        pos_a_data = self.view_box.mapFromScene(pos_a_scene)
-        self.proxy_a.setPos(pos_a_data)
-
-        center_x_scene = view_rect_scene.x() + view_width_scene / 2
-
-        bottom_y_scene = view_rect_scene.y() + view_height_scene - offset_pixels - label_p_size.height()
-
-        pos_p_scene = QPointF(center_x_scene - label_p_size.width() / 2, bottom_y_scene)
-
-        pos_p_data = self.view_box.mapFromScene(pos_p_scene)
-        self.proxy_p.setPos(pos_p_data)
-
-
-        left_x_scene = view_rect_scene.x() + offset_pixels
-
-        center_y_scene = view_rect_scene.y() + view_height_scene / 2
- 
-        pos_l_scene = QPointF(left_x_scene, center_y_scene - label_l_size.height() / 2)
-
-        pos_l_data = self.view_box.mapFromScene(pos_l_scene)
-        self.proxy_l.setPos(pos_l_data)
-
-
-        right_x_scene = view_rect_scene.x() + view_width_scene - offset_pixels - label_r_size.width()
-
-        center_y_scene = view_rect_scene.y() + view_height_scene / 2
-
-        pos_r_scene = QPointF(right_x_scene, center_y_scene - label_r_size.height() / 2)
-
-        pos_r_data = self.view_box.mapFromScene(pos_r_scene)
-        self.proxy_r.setPos(pos_r_data)
+        # Геометрия ViewBox в координатах сцены кэшируется по диапазону, размеру и положению ViewBox
+        view_box = self.view_box
+        (x_min, x_max), (y_min, y_max) = view_box.viewRange()
+        view_box_pos = view_box.scenePos()
+        geometry_key = (x_min, x_max, y_min, y_max, view_box.width(), view_box.height(), view_box_pos.x(), view_box_pos.y())
+        cached_geometry = self._cached_view_geometry
+        if cached_geometry is not None and cached_geometry[0] == geometry_key:
+            _, view_rect_scene, scene_to_view_linear, scene_to_view_offset = cached_geometry
+        else:
+            # Получаем текущие размеры ViewBox в координатах сцены (пикселях экрана)
+            view_rect_scene = view_box.mapRectToScene(view_box.viewRect())
+            scene_to_view, _ = view_box.sceneTransform().inverted()
+            # Аффинная часть обратного преобразования в виде матрицы 2x2 и смещения для пакетного применения
+            scene_to_view_linear = np.array([[scene_to_view.m11(), scene_to_view.m12()],
+                                             [scene_to_view.m21(), scene_to_view.m22()]])
+            scene_to_view_offset = np.array([scene_to_view.dx(), scene_to_view.dy()])
+            self._cached_view_geometry = (geometry_key, view_rect_scene, scene_to_view_linear, scene_to_view_offset)
+
+        # Читаем геометрию один раз и дальше работаем с локальными переменными
+        vx = view_rect_scene.x()
+        vy = view_rect_scene.y()
+        vw = view_rect_scene.width()
+        vh = view_rect_scene.height()
+
+        # Кэшированные размеры меток в пикселях экрана
+        (a_width, _), (p_width, p_height), (_, l_height), (r_width, r_height) = self._side_label_sizes
+
+        # Небольшой отступ от края в пикселях экрана
+        offset_pixels = 10
+
+        center_x_scene = vx + vw * 0.5
+        center_y_scene = vy + vh * 0.5
+        top_y_scene = vy + offset_pixels
+        bottom_y_scene = vy + vh - offset_pixels
+        left_x_scene = vx + offset_pixels
+        right_x_scene = vx + vw - offset_pixels
+
+        # Целевые точки всех четырех меток (A, P, L, R) переводятся из сцены в ViewBox одним матричным умножением
+        label_points_scene = np.array([
+            [center_x_scene - a_width / 2, top_y_scene],
+            [center_x_scene - p_width / 2, bottom_y_scene - p_height],
+            [left_x_scene, center_y_scene - l_height / 2],
+            [right_x_scene - r_width, center_y_scene - r_height / 2],
+        ])
+        label_points_view = label_points_scene @ scene_to_view_linear + scene_to_view_offset
+        for proxy, (x, y) in zip((self.proxy_a, self.proxy_p, self.proxy_l, self.proxy_r), label_points_view.tolist()):
+            proxy.setPos(x, y)
 
 
     def _update_segmentation_button_tooltips(self):
@@ -560,51 +1301,96 @@ class ViewerPanel(QWidget):
             self.model_loaded_status.emit(False)
             return
 
-        if not os.path.isdir(self.models_dir):
+        # Ищем файл модели за один проход по папке: первый .pth сразу, иначе первый .pt
+        model_path = None
+        fallback_path = None
+        try:
+            with os.scandir(self.models_dir) as entries:
+                for entry in entries:
+                    name = entry.name.lower()
+                    if not name.endswith(('.pth', '.pt')) or not entry.is_file():
+                        continue
+                    if name.endswith('.pth'):
+                        model_path = entry.path
+                        break
+                    if fallback_path is None:
+                        fallback_path = entry.path
+        except OSError:
             logger.warning(f"Папка моделей не найдена: {self.models_dir}")
             self.model_loaded_status.emit(False)
             return
+        model_path = model_path or fallback_path
 
-        # Ищем первый файл модели (.pth или .pt) в папке моделей
-        model_files = glob.glob(os.path.join(self.models_dir, '*.pth')) + glob.glob(os.path.join(self.models_dir, '*.pt'))
-
-        if not model_files:
+        if model_path is None:
             logger.warning(f"Файлы моделей (.pth, .pt) не найдены в папке: {self.models_dir}")
             self.model_loaded_status.emit(False)
             return
 
-        # Берем первый найденный файл
-        model_path = model_files[0]
         logger.info(f"Попытка автоматической загрузки модели: {model_path}")
 
-        QTimer.singleShot(100, lambda: self._perform_model_loading(model_path))
+        # Загрузка запускается после первого показа панели (см. showEvent)
+        self._auto_model_path = model_path
+        if self.isVisible():
+            self._schedule_auto_model_load()
+
+    def _schedule_auto_model_load(self):
+        """ Ставит отложенную автозагрузку модели на следующую итерацию цикла событий. """
+        model_path = self._auto_model_path
+        if model_path is None:
+            return
+        self._auto_model_path = None
+        QTimer.singleShot(0, partial(self._perform_model_loading, model_path))
+
+    def showEvent(self, event):
+        """ При первом показе панели запускает автозагрузку модели, уже после первой отрисовки окна. """
+        super().showEvent(event)
+        self._schedule_auto_model_load()
 
 
     def _perform_model_loading(self, model_path):
-        """ Выполняет фактическую загрузку модели. """
-        QApplication.setOverrideCursor(Qt.WaitCursor)
-        try:
-            success = self.segmenter.load_model(model_path)
-            self.model_loaded_status.emit(success)
-            if success:
-                 logger.info(f"Автоматическая загрузка модели успешна: {os.path.basename(model_path)}")
-            else:
-                 logger.error(f"Автоматическая загрузка модели не удалась: {os.path.basename(model_path)}")
-                 QMessageBox.critical(self, "Ошибка загрузки модели", f"Не удалось автоматически загрузить модель из файла:\n{model_path}\n\nПроверьте логи.")
-        except Exception as e:
-            logger.error(f"Исключение при автоматической загрузке модели: {e}", exc_info=True)
-            self.model_loaded_status.emit(False)
-            QMessageBox.critical(self, "Ошибка загрузки модели", f"Произошла ошибка при автоматической загрузке модели:\n{str(e)}\n\nПроверьте логи.")
-        finally:
-            QApplication.restoreOverrideCursor()
-            # Обновляем состояние кнопок сегментации после попытки загрузки модели
-            self._update_segmentation_controls_state()
+        """ Запускает загрузку модели в фоновом потоке, не блокируя интерфейс. """
+        if self.model_load_thread is not None:
+            logger.warning("Загрузка модели уже выполняется.")
+            return
+
+        self._model_load_path = model_path
+        self.segmentation_status_update.emit(f"Загрузка модели сегментации: {os.path.basename(model_path)}...")
+
+        self.model_load_thread = QThread(self)
+        self.model_load_worker = ModelLoadWorker(self.segmenter, model_path)
+        self.model_load_worker.moveToThread(self.model_load_thread)
+        self.model_load_worker.finished.connect(self._on_model_load_finished)
+        self.model_load_worker.finished.connect(self.model_load_thread.quit)
+        self.model_load_worker.finished.connect(self.model_load_worker.deleteLater)
+        self.model_load_thread.started.connect(self.model_load_worker.run)
+        self.model_load_thread.finished.connect(self.model_load_thread.deleteLater)
+        self.model_load_thread.start()
+
+
+    @pyqtSlot(bool, str)
+    def _on_model_load_finished(self, success, error_message):
+        """ Обрабатывает результат фоновой загрузки модели. """
+        model_path = self._model_load_path
+        self.model_load_thread = None
+        self.model_load_worker = None
+        self._model_load_path = None
+
+        self.model_loaded_status.emit(success)
+        if success:
+             logger.info(f"Автоматическая загрузка модели успешна: {os.path.basename(model_path)}")
+        elif error_message:
+             QMessageBox.critical(self, "Ошибка загрузки модели", f"Произошла ошибка при автоматической загрузке модели:\n{error_message}\n\nПроверьте логи.")
+        else:
+             logger.error(f"Автоматическая загрузка модели не удалась: {os.path.basename(model_path)}")
+             QMessageBox.critical(self, "Ошибка загрузки модели", f"Не удалось автоматически загрузить модель из файла:\n{model_path}\n\nПроверьте логи.")
+        # Обновляем состояние кнопок сегментации после попытки загрузки модели
+        self._update_segmentation_controls_state()
 
 
     def _show_placeholder(self):
 
-        placeholder_image = np.zeros((512, 512), dtype=np.uint8)
-        self.img_item.setImage(placeholder_image)
+        self.img_item.setImage(_PLACEHOLDER_IMG)
+        self._overlay_fused = False
         self.mask_item.clear()
         self.mask_item.setVisible(False)
         self.view_box.autoRange()
@@ -618,8 +1404,11 @@ class ViewerPanel(QWidget):
 
         self.current_volume_hu = None
         self.current_pixel_data_hu = None
+        self._display_cache.clear()
+        self._prefetch_generation += 1
         self.segmentation_mask = None
-        self.full_segmentation_mask_volume = None
+        self._set_full_mask_volume(None)
+        self._mask_buf = None
         self.pixel_spacing = (1.0, 1.0) 
         self._clear_measurements_on_slice(self.current_slice_index) # Очищаем измерения при сбросе
         # Обновляем состояние кнопок после сброса данных
@@ -645,7 +1434,7 @@ class ViewerPanel(QWidget):
         total_slices = len(self.current_series.get('files', []))
         # Увеличиваем шаг прокрутки для больших серий
         if total_slices > 100: step = max(1, total_slices // 50)
-        current_index = self.current_slice_index
+        current_index = self.slice_slider.value() # Отображение среза может быть еще отложено таймером
         if delta > 0: new_index = max(0, current_index - step)
         else: new_index = min(total_slices - 1, current_index + step)
 
@@ -657,9 +1446,15 @@ class ViewerPanel(QWidget):
 
 
     def load_series(self, series_data):
-        """Загрузка новой серии, с остановкой предыдущей сегментации."""
+        """
+        Загрузка новой серии, с остановкой предыдущей сегментации.
+        Срезы читаются в фоновом потоке (SeriesLoaderWorker), по готовности объема
+        вызывается _on_series_volume_ready и отправляется series_loaded.
+        """
         logger.info("Загрузка новой серии...")
-        # Отменяем любую текущую сегментацию перед загрузкой новой серии
+        self._series_generation += 1
+        # Отменяем незавершенную загрузку предыдущей серии и любую текущую сегментацию
+        self.cancel_series_load()
         self.cancel_segmentation()
 
         if self.segmentation_thread is not None and self.segmentation_thread.isRunning():
@@ -684,6 +1479,18 @@ class ViewerPanel(QWidget):
         self.current_series = series_data
         # Очищаем все сохраненные измерения при загрузке новой серии
         self._measurements_by_slice.clear()
+        self._measurement_slice_by_id.clear()
+        for group in self._measurement_groups_by_slice.values():
+             self._remove_scene_item(group)
+        self._measurement_groups_by_slice.clear()
+        self._hot_slices.clear()
+        self._measurement_curves_by_slice.clear()
+        self._measurement_labels_by_slice.clear()
+        self._measurement_counts.clear()
+        self._any_on_current = False
+        self._measurement_endpoints_by_slice.clear()
+        self._measurement_ids_by_slice.clear()
+        self._measurement_geometry_by_slice.clear()
         logger.debug("Все сохраненные измерения очищены при загрузке новой серии.")
 
 
@@ -691,53 +1498,118 @@ class ViewerPanel(QWidget):
             logger.warning("Попытка загрузить пустую серию")
             # Обновляем состояние кнопок после загрузки пустой серии
             self._update_segmentation_controls_state()
-            self._update_measurement_controls_state() # Обновляем состояние измерения
-            self.measurement_state_changed.emit(False, self._measurement_mode_active, False) # Оповещаем MainWindow
+            self._update_measurement_controls_state() # Обновляем состояние измерения и оповещаем MainWindow
+            self.series_loaded.emit(False)
             return
         files = series_data.get('files', [])
         slice_count = len(files)
         logger.info(f"Загрузка {slice_count} срезов в память...")
-        QApplication.setOverrideCursor(Qt.WaitCursor)
-        volume_hu_list = []
-        first_ds = None
-        try:
-            # Используем переданный экземпляр DicomLoader
-            dicom_loader = self.dicom_loader
-            if dicom_loader is None:
-                 # Этого не должно произойти, если DicomLoader передан в конструктор
-                 logger.error("Экземпляр DicomLoader не был передан в ViewerPanel.")
-                 raise RuntimeError("DicomLoader недоступен.")
+        if self.dicom_loader is None:
+             # Этого не должно произойти, если DicomLoader передан в конструктор
+             logger.error("Экземпляр DicomLoader не был передан в ViewerPanel.")
+             QMessageBox.critical(self, "Ошибка загрузки серии", "Не удалось загрузить данные серии:\nDicomLoader недоступен.")
+             self.series_loaded.emit(False)
+             return
 
-            for i, file_meta in enumerate(files):
-                # Используем метод load_pixel_data из DicomLoader
-                pixel_data = dicom_loader.load_pixel_data(file_meta)
-                if pixel_data is None:
-                     logger.warning(f"Не удалось загрузить пиксельные данные для файла: {file_meta.get('file_path', 'N/A')}")
-                     continue 
+        # Чтение срезов выполняется в фоновом потоке, интерфейс остается отзывчивым
+        parent_widget = self.parent() if self.parent() else self
+        self._series_load_dialog = QProgressDialog("Загрузка срезов серии...", "Отмена", 0, slice_count, parent_widget)
+        self._series_load_dialog.setWindowModality(Qt.WindowModal)
+        self._series_load_dialog.setMinimumDuration(500) # Показываем диалог только если загрузка занимает > 0.5 сек
+        self._series_load_dialog.setAutoReset(False)
+        self._series_load_dialog.setAutoClose(False)
+        self._series_load_dialog.setValue(0)
+
+        self.series_load_thread = QThread(self)
+        self.series_load_worker = SeriesLoaderWorker(self.dicom_loader, files)
+        self.series_load_worker.moveToThread(self.series_load_thread)
+        # Воркер передается в обработчики, чтобы отбрасывать сигналы отмененной загрузки,
+        # уже поставленные в очередь к моменту cancel_series_load()
+        self.series_load_worker.preview_ready.connect(partial(self._on_series_preview_ready, self.series_load_worker))
+        self.series_load_worker.progress.connect(partial(self._on_series_load_progress, self.series_load_worker))
+        self.series_load_worker.error.connect(partial(self._on_series_load_error, self.series_load_worker))
+        self.series_load_worker.finished.connect(partial(self._on_series_volume_ready, self.series_load_worker))
+        self.series_load_worker.finished.connect(self.series_load_thread.quit)
+        self.series_load_worker.finished.connect(self.series_load_worker.deleteLater)
+        self.series_load_thread.started.connect(self.series_load_worker.run)
+        self.series_load_thread.finished.connect(self.series_load_thread.deleteLater)
+        self._series_load_dialog.canceled.connect(self.series_load_worker.cancel)
+        self.series_load_thread.start()
+
+    def cancel_series_load(self):
+        """
+        Отменяет фоновую загрузку серии, если она выполняется.
+        Сигналы отмененного воркера игнорируются обработчиками, поэтому результат устаревшей загрузки
+        не применяется; поток завершается и удаляется сам.
+        """
+        worker = self.series_load_worker
+        self.series_load_thread = None
+        self.series_load_worker = None
+        self._dismiss_series_load_dialog()
+        if worker is None:
+             return
+        try:
+            worker.cancel()
+        except RuntimeError:
+            pass # Воркер уже завершился и удален
+        logger.info("Фоновая загрузка предыдущей серии отменена.")
+
+    def _dismiss_series_load_dialog(self):
+        """ Закрывает диалог загрузки серии. """
+        dialog = self._series_load_dialog
+        self._series_load_dialog = None
+        if dialog is not None:
+             try:
+                 dialog.canceled.disconnect()
+             except TypeError:
+                 pass
+             dialog.hide()
+             dialog.deleteLater()
+
+    def _on_series_preview_ready(self, worker, slice_hu):
+        """ Показывает первый загруженный срез, пока остальной объем еще читается. """
+        if worker is not self.series_load_worker or self.current_volume_hu is not None:
+             return
+        window_center, window_width = WindowPresets.get_preset("Легочное")
+        self._show_image_buffer(self.img_item, self._window_slice(slice_hu, window_center, window_width), autoLevels=False, levels=None)
+        self.view_box.autoRange()
+        self.info_label.setText("Загрузка серии...")
 
-                volume_hu_list.append(pixel_data)
+    def _on_series_load_progress(self, worker, current, total):
+        """ Обновляет диалог прогресса загрузки серии. """
+        if worker is self.series_load_worker and self._series_load_dialog is not None:
+             self._series_load_dialog.setValue(current)
 
-            if not volume_hu_list:
-                 logger.error("Не удалось загрузить пиксельные данные ни для одного среза в серии.")
-                 raise RuntimeError("Не удалось загрузить данные серии.")
+    def _on_series_load_error(self, worker, error_message):
+        """ Обрабатывает ошибку фоновой загрузки серии. """
+        if worker is not self.series_load_worker:
+             return
+        self._dismiss_series_load_dialog()
+        QMessageBox.critical(self, "Ошибка загрузки серии", f"Не удалось загрузить данные серии:\n{error_message}")
 
-            self.current_volume_hu = np.stack(volume_hu_list, axis=0)
-            logger.info(f"Объем загружен. Форма: {self.current_volume_hu.shape}")
+    def _on_series_volume_ready(self, worker, volume_hu, first_ds):
+        """
+        Применяет загруженный объем: диапазон слайдера, Pixel Spacing, отображение среза и информацию о серии.
 
-            if files:
-                 try:
-                     first_ds = pydicom.dcmread(files[0].get('file_path'), force=True, stop_before_pixels=True)
-                 except Exception as e:
-                     logger.warning(f"Не удалось прочитать первый DICOM файл для информации: {e}")
-                     first_ds = None
+        Args:
+            worker (SeriesLoaderWorker): Воркер, отправивший результат (результат отмененной загрузки игнорируется).
+            volume_hu (np.ndarray): Объем HU (Z, H, W) или None при ошибке/отмене.
+            first_ds (pydicom.Dataset): Первый файл серии без пиксельных данных или None.
+        """
+        if worker is not self.series_load_worker:
+             return
+        self.series_load_thread = None
+        self.series_load_worker = None
+        self._dismiss_series_load_dialog()
 
-        except Exception as e:
-            logger.error(f"Ошибка при загрузке объема серии: {e}", exc_info=True)
-            QMessageBox.critical(self, "Ошибка загрузки серии", f"Не удалось загрузить данные серии:\n{str(e)}")
-            self._show_placeholder()
-            return
-        finally:
-            QApplication.restoreOverrideCursor()
+        series_data = self.current_series
+        files = series_data.get('files', []) if series_data else []
+        if volume_hu is None:
+             self._show_placeholder()
+             self._update_measurement_controls_state()
+             self.series_loaded.emit(False)
+             return
+        self.current_volume_hu = volume_hu
 
         slice_count = self.current_volume_hu.shape[0] if self.current_volume_hu is not None else 0
         if slice_count > 0:
@@ -784,6 +1656,7 @@ class ViewerPanel(QWidget):
                   self.pixel_spacing = (1.0, 1.0) # Сбрасываем на дефолт
 
 
+             self._invalidate_scene_to_img() # Масштаб пикселей мог измениться
              self._update_slice_display(self.slice_slider.value())
 
              patient_name_obj = getattr(first_ds, 'PatientName', 'N/A') if first_ds else 'N/A'
@@ -801,83 +1674,252 @@ class ViewerPanel(QWidget):
 
 
         self._update_segmentation_controls_state()
-        # Обновляем состояние кнопки измерения после загрузки данных серии
+        # Обновляем состояние кнопки измерения после загрузки данных серии и оповещаем MainWindow
         self._update_measurement_controls_state()
-        # Оповещаем MainWindow об изменении состояния данных
-        self.measurement_state_changed.emit(self.current_volume_hu is not None, self._measurement_mode_active, len(self._measurements_by_slice.get(self.current_slice_index, [])) > 0)
+        self.series_loaded.emit(self.current_volume_hu is not None)
 
         # Устанавливаем фокус на ViewerPanel после загрузки данных
         self.setFocus()
 
 
-    def _update_slice_display(self, slice_index):
+    def _window_lut(self, dtype, window_center, window_width):
         """
-        Обновляет отображение текущего среза, маски и измерений.
+        Возвращает LUT окна для типа данных из LRU кэша (строится при отсутствии).
+
+        Args:
+            dtype (np.dtype): Тип данных среза.
+            window_center (float): Центр окна.
+            window_width (float): Ширина окна.
+
+        Returns:
+            np.ndarray: LUT uint8 или None, если тип не поддерживается WindowPresets.build_lut.
         """
-        if self.current_volume_hu is None: return
-        if slice_index < 0 or slice_index >= self.current_volume_hu.shape[0]: return
+        lut_key = (dtype.str, window_center, window_width)
+        if lut_key in self._window_lut_cache:
+            self._window_lut_cache.move_to_end(lut_key)
+            return self._window_lut_cache[lut_key]
+        lut = self._window_lut_cache[lut_key] = WindowPresets.build_lut(dtype, window_center, window_width)
+        if len(self._window_lut_cache) > WINDOW_LUT_CACHE_SIZE:
+            self._window_lut_cache.popitem(last=False)
+        return lut
+
+    def _window_slice(self, slice_hu, window_center, window_width):
+        """
+        Применяет окно к срезу и возвращает яркость (0-255) в постоянном буфере uint8.
+        Для целых 1-2 байтовых данных используется кэшированная LUT, иначе - преобразование на месте во float32.
 
-        # Скрываем измерения предыдущего среза перед обновлением
-        self._hide_measurements_on_slice(self.current_slice_index)
+        Args:
+            slice_hu (np.ndarray): Срез HU (H, W).
+            window_center (float): Центр окна.
+            window_width (float): Ширина окна.
 
-        has_full_mask = self.full_segmentation_mask_volume is not None
-        is_new_slice = slice_index != self.current_slice_index # Проверяем, изменился ли срез
+        Returns:
+            np.ndarray: Буфер (H, W) uint8, переиспользуемый между срезами.
+        """
+        display_buf = self._display_buf
+        if display_buf is None or display_buf.shape != slice_hu.shape:
+            display_buf = self._display_buf = np.empty(slice_hu.shape, dtype=np.uint8)
+            self._display_scratch = None
+
+        lut = self._window_lut(slice_hu.dtype, window_center, window_width)
+        if lut is not None and slice_hu.flags.c_contiguous:
+            # mode='clip' - без промежуточного буфера для out (индексы беззнакового представления всегда в пределах LUT)
+            np.take(lut, slice_hu.view(slice_hu.dtype.str.replace('i', 'u')), out=display_buf, mode='clip')
+            return display_buf
+
+        scratch = self._display_scratch
+        if scratch is None:
+            scratch = self._display_scratch = np.empty(slice_hu.shape, dtype=np.float32)
+        min_val = window_center - window_width / 2.0
+        np.subtract(slice_hu, min_val, out=scratch, casting='unsafe')
+        if window_width > 0:
+            np.multiply(scratch, 255.0, out=scratch)
+            np.divide(scratch, window_width, out=scratch)
+        else:
+            scratch.fill(0.0)
+        np.clip(scratch, 0, 255, out=scratch)
+        np.copyto(display_buf, scratch, casting='unsafe')
+        return display_buf
 
-        # Обновляем основные данные среза
-        self.current_slice_index = slice_index
-        self.current_pixel_data_hu = self.current_volume_hu[slice_index]
+    def _display_slice(self, slice_index, slice_hu, window_center, window_width):
+        """
+        Записывает срез объема в окне в _display_buf, используя кэш недавно показанных срезов:
+        при попадании срез только копируется, иначе применяется окно и результат кэшируется.
 
-        # Отображаем КТ
-        window_center, window_width = WindowPresets.get_preset("Легочное")
-        display_image_hu = self.current_pixel_data_hu
-        self.img_item.setImage(display_image_hu.T, autoLevels=False, levels=[window_center - window_width / 2.0, window_center + window_width / 2.0]) # Транспонируем для правильной ориентации
-
-        # Автоматическое масштабирование при первой загрузке среза
-        if not hasattr(self, '_view_reset_done') or not self._view_reset_done:
-             self.view_box.autoRange()
-             self._view_reset_done = True
-             self._update_side_label_positions()
-
-        # Обновляем маску и чекбокс
-        if has_full_mask:
-            # Если есть полная маска, берем срез из нее
-            if slice_index < self.full_segmentation_mask_volume.shape[0]:
-                self.segmentation_mask = self.full_segmentation_mask_volume[slice_index]
-            else: 
-                self.segmentation_mask = None
+        Args:
+            slice_index (int): Индекс среза в объеме.
+            slice_hu (np.ndarray): Срез HU (H, W).
+            window_center (float): Центр окна.
+            window_width (float): Ширина окна.
+
+        Returns:
+            np.ndarray: Буфер (H, W) uint8 (_display_buf).
+        """
+        key = (slice_index, window_center, window_width)
+        cached = self._display_cache.get(key)
+        display_buf = self._display_buf
+        if cached is not None and display_buf is not None and display_buf.shape == cached.shape:
+            self._display_cache.move_to_end(key)
+            np.copyto(display_buf, cached)
+            return display_buf
+
+        display_buf = self._window_slice(slice_hu, window_center, window_width)
+        self._display_cache[key] = display_buf.copy()
+        if len(self._display_cache) > DISPLAY_CACHE_SLICES:
+            self._display_cache.popitem(last=False)
+        return display_buf
+
+    def _prefetch_neighbour_slices(self, slice_index, window_center, window_width):
+        """
+        Запускает фоновый перевод в окно соседних срезов (±DISPLAY_PREFETCH_SLICES, ближние первыми),
+        которых еще нет в кэше отображения. Предыдущая незавершенная подготовка становится неактуальной.
+        """
+        self._prefetch_generation += 1
+        volume = self.current_volume_hu
+        if volume is None:
+            return
+        indices = []
+        for offset in range(1, DISPLAY_PREFETCH_SLICES + 1):
+            for index in (slice_index + offset, slice_index - offset):
+                if 0 <= index < volume.shape[0] and (index, window_center, window_width) not in self._display_cache:
+                    indices.append(index)
+        if indices:
+            generation = self._prefetch_generation
+            self._prefetch_pool.start(DisplayPrefetchTask(
+                self._prefetch_signals, generation, lambda: self._prefetch_generation,
+                volume, indices, window_center, window_width, self._window_lut(volume.dtype, window_center, window_width)))
+
+    @pyqtSlot(int, object)
+    def _on_prefetched_slices(self, generation, results):
+        """ Добавляет подготовленные в фоне срезы в кэш отображения, если запрос еще актуален. """
+        if generation != self._prefetch_generation:
+            return
+        for key, display in results:
+            if key not in self._display_cache:
+                self._display_cache[key] = display
+        while len(self._display_cache) > DISPLAY_CACHE_SLICES:
+            self._display_cache.popitem(last=False)
+
+    @staticmethod
+    def _show_image_buffer(item, buffer, **kwargs):
+        """
+        Показывает массив в ImageItem. Если элемент уже отображает эту же память
+        (постоянный буфер, перезаписанный на месте), вызывается только updateImage() -
+        без повторной установки данных и опций; иначе - полный setImage().
+        Буфер должен оставаться тем же массивом, который pyqtgraph получил при setImage().
+
+        Args:
+            item (pg.ImageItem): Элемент изображения.
+            buffer (np.ndarray): Данные для отображения.
+            **kwargs: Параметры setImage() для первой установки.
+        """
+        current = item.image
+        if current is not None and current.dtype == buffer.dtype and current.shape == buffer.shape \
+                and current.strides == buffer.strides and current.ctypes.data == buffer.ctypes.data:
+            item.updateImage()
+        else:
+            item.setImage(buffer, **kwargs)
 
-        elif is_new_slice:
+    def _get_slice_hu(self, slice_index):
+        """
+        Возвращает срез HU (H, W) загруженного объема или None, если объема нет или индекс вне диапазона.
+        Единственная проверка индекса среза перед обращением к объему.
+        """
+        volume = self.current_volume_hu
+        if volume is None or slice_index < 0 or slice_index >= volume.shape[0]:
+            return None
+        return volume[slice_index]
 
-            self.segmentation_mask = None
+    def _update_slice_display(self, slice_index):
+        """
+        Обновляет отображение текущего среза, маски и измерений.
+        """
+        slice_hu = self._get_slice_hu(slice_index)
+        if slice_hu is None: return
+
+        # Промежуточные изменения состояния измерений (снятие выделения, смена среза)
+        # оповещаются одним сигналом по завершении обновления
+        with self.batch_updates():
+            mask_meta = self._mask_meta
+            is_new_slice = slice_index != self.current_slice_index # Проверяем, изменился ли срез
+
+            # Скрываем измерения предыдущего среза перед обновлением
+            if is_new_slice:
+                 self._deselect_measurement()
+                 self._set_measurements_visible(self.current_slice_index, False)
+
+            # Обновляем основные данные среза
+            self.current_slice_index = slice_index
+            self.current_pixel_data_hu = slice_hu
+
+            # Отображаем КТ
+            window_center, window_width = WindowPresets.get_preset("Легочное")
+            self._display_slice(slice_index, slice_hu, window_center, window_width)
+            self._show_slice_image(self._fused_mask_slice())
+            if is_new_slice:
+                 self._prefetch_neighbour_slices(slice_index, window_center, window_width)
+
+            # Автоматическое масштабирование при первой загрузке среза
+            if not hasattr(self, '_view_reset_done') or not self._view_reset_done:
+                 self.view_box.autoRange()
+                 self._view_reset_done = True
+                 self._update_side_label_positions()
+
+            # Обновляем маску и чекбокс
+            if mask_meta is not None:
+                # Если есть полная маска, берем срез из нее
+                if slice_index < mask_meta[0][0]:
+                    self.segmentation_mask = self.full_segmentation_mask_volume.slice_view(slice_index)
+                else: 
+                    self.segmentation_mask = None
+
+            elif is_new_slice:
 
-        self._update_mask_overlay() # Обновляем отображение маски
+                self.segmentation_mask = None
 
-        total_slices = self.current_volume_hu.shape[0]
-        self.slice_label.setText(f"{slice_index + 1}/{total_slices}")
-        self.slice_changed.emit(slice_index)
+            self._update_mask_overlay() # Обновляем отображение маски
 
-        # Отображаем измерения для текущего среза 
-        self._show_measurements_on_slice(self.current_slice_index)
+            total_slices = self.current_volume_hu.shape[0]
+            self.slice_label.setText(f"{slice_index + 1}/{total_slices}")
+            self.slice_changed.emit(slice_index)
 
-        # Обновляем состояние действий измерения 
-        self._update_measurement_controls_state()
+            # Отображаем измерения для текущего среза (для того же среза элементы уже на сцене)
+            self._set_measurements_visible(self.current_slice_index, True)
 
 
 
     @pyqtSlot(int)
     def _on_slice_changed(self, value):
-        if value == self.current_slice_index: return
-        self._update_slice_display(value)
+        # Значения слайдера при перетаскивании/прокрутке накапливаются, отображается только последнее за кадр
+        self._pending_slice = value
+        self._slice_timer.start()
+
+    @pyqtSlot()
+    def _flush_slice(self):
+        """ Отображает последний запрошенный срез (по таймеру-коалесцеру смены среза). """
+        slice_index = self._pending_slice
+        self._pending_slice = None
+        if slice_index is None or slice_index == self.current_slice_index: return
+        self._update_slice_display(slice_index)
 
     def _on_prev_slice(self):
-        new_index = max(0, self.current_slice_index - 1)
-        if new_index != self.current_slice_index: self.slice_slider.setValue(new_index)
+        # Шаг отсчитывается от значения слайдера: отображение среза может быть еще отложено
+        current_index = self.slice_slider.value()
+        new_index = max(0, current_index - 1)
+        if new_index != current_index: self.slice_slider.setValue(new_index)
 
     def _on_next_slice(self):
         if self.current_volume_hu is None: return
         total_slices = self.current_volume_hu.shape[0]
-        new_index = min(total_slices - 1, self.current_slice_index + 1)
-        if new_index != self.current_slice_index: self.slice_slider.setValue(new_index)
+        current_index = self.slice_slider.value()
+        new_index = min(total_slices - 1, current_index + 1)
+        if new_index != current_index: self.slice_slider.setValue(new_index)
+
+    @pyqtSlot()
+    def _do_refresh(self):
+        """ Отложенное обновление состояния кнопок сегментации и оверлея маски. """
+        self._update_segmentation_controls_state()
+        self._update_mask_overlay()
 
     @pyqtSlot(bool)
     def _on_segment_toggle(self, checked):
@@ -891,6 +1933,12 @@ class ViewerPanel(QWidget):
              logger.error("Попытка запуска сегментации, но модуль недоступен.")
              QMessageBox.critical(self, "Ошибка", "Модуль сегментации недоступен.")
              return False
+        if self.model_load_thread is not None:
+            QMessageBox.information(self, "Модель загружается", "Модель сегментации еще загружается. Повторите попытку позже.")
+            return False
+        if self._single_segmentation_request is not None:
+            QMessageBox.information(self, "Сегментация", "Сегментация среза еще выполняется.")
+            return False
         if self.segmenter.model is None:
             logger.warning("Модель сегментации не загружена.")
             QMessageBox.warning(self, "Модель не загружена", "Модель сегментации не загружена автоматически. Проверьте наличие файла модели в папке ~/.pylungviewer/models.")
@@ -907,9 +1955,10 @@ class ViewerPanel(QWidget):
         Обновляет состояние кнопок и чекбокса сегментации
         в зависимости от наличия модели и загруженных данных.
         """
-        model_is_loaded = SEGMENTATION_AVAILABLE and self.segmenter is not None and self.segmenter.model is not None
+        model_is_loaded = SEGMENTATION_AVAILABLE and self.segmenter is not None and self.segmenter.model is not None and self.model_load_thread is None \
+                          and self._single_segmentation_request is None
         data_is_loaded = self.current_volume_hu is not None
-        full_mask_is_available = self.full_segmentation_mask_volume is not None
+        full_mask_is_available = self._mask_meta is not None
         single_mask_is_available = self.segmentation_mask is not None
 
         self.run_segment_btn.setEnabled(model_is_loaded and data_is_loaded)
@@ -917,7 +1966,7 @@ class ViewerPanel(QWidget):
 
         self.segment_checkbox.setEnabled(full_mask_is_available or single_mask_is_available)
 
-        if not self.segment_checkbox.isEnabled():
+        if not self.segment_checkbox.isEnabled() and self.segment_checkbox.isChecked():
              self.segment_checkbox.setChecked(False)
 
 
@@ -937,22 +1986,20 @@ class ViewerPanel(QWidget):
         """ Обрабатывает результат сегментации всего объема. """
         logger.info("Поток сегментации завершен (сигнал от воркера).")
 
-        if self.progress_dialog:
-            try:
-                self.progress_dialog.canceled.disconnect(self.cancel_segmentation)
-            except TypeError:
-                pass
-            self.progress_dialog.close()
-            self.progress_dialog = None
+        self._dismiss_progress_dialog()
 
         worker_cancelled = self.segmentation_worker is not None and self.segmentation_worker.is_cancelled
 
         if result_volume is not None and not worker_cancelled:
-            self.full_segmentation_mask_volume = result_volume
+            self._set_full_mask_volume(result_volume)
             logger.info(f"Получен 3D массив масок формы: {result_volume.shape}")
             self.segmentation_status_update.emit("Сегментация всего объема завершена.")
-            self._update_slice_display(self.current_slice_index)
+            # Чекбокс включается без сигнала toggled: оверлей строится один раз в _update_slice_display,
+            # а не еще и в _on_segment_toggle
+            signals_were_blocked = self.segment_checkbox.blockSignals(True)
             self.segment_checkbox.setChecked(True)
+            self.segment_checkbox.blockSignals(signals_were_blocked)
+            self._update_slice_display(self.current_slice_index)
         else:
             if worker_cancelled:
                  logger.info("Сегментация была отменена пользователем.")
@@ -960,13 +2007,15 @@ class ViewerPanel(QWidget):
             else:
                  logger.error("Сегментация всего объема не удалась (результат None).")
                  self.segmentation_status_update.emit("Ошибка сегментации всего объема.")
-            self.full_segmentation_mask_volume = None
+            self._set_full_mask_volume(None)
 
+            # Оверлей скроет отложенное обновление (_refresh_timer ниже)
+            signals_were_blocked = self.segment_checkbox.blockSignals(True)
             self.segment_checkbox.setChecked(False)
-            self._update_mask_overlay() # Скрываем оверлей
+            self.segment_checkbox.blockSignals(signals_were_blocked)
 
         self._set_segmentation_controls_enabled(True)
-        self._update_segmentation_controls_state()
+        self._refresh_timer.start() # Обновляем кнопки и оверлей
 
 
 
@@ -978,58 +2027,66 @@ class ViewerPanel(QWidget):
         QMessageBox.critical(self, "Ошибка сегментации", f"Произошла ошибка во время сегментации:\n{error_message}")
         self.segmentation_status_update.emit("Ошибка сегментации.")
 
-        if self.progress_dialog:
-            try:
-                self.progress_dialog.canceled.disconnect(self.cancel_segmentation)
-            except TypeError:
-                pass
-            self.progress_dialog.close()
-            self.progress_dialog = None
+        self._dismiss_progress_dialog()
 
-        self.full_segmentation_mask_volume = None
-        self._update_segmentation_controls_state() # Обновляем состояние кнопок и чекбокса
-        self._update_mask_overlay() # Скрываем оверлей
+        self._set_full_mask_volume(None)
+        self._refresh_timer.start() # Обновляем состояние кнопок, чекбокса и скрываем оверлей
 
 
     @pyqtSlot()
+    def _dismiss_progress_dialog(self):
+        """ Скрывает диалог прогресса сегментации; уничтожение откладывается до цикла событий. """
+        dialog = self.progress_dialog
+        if dialog is None:
+            return
+        self.progress_dialog = None
+        try:
+            dialog.canceled.disconnect(self.cancel_segmentation)
+        except TypeError:
+            pass
+        dialog.hide()
+        dialog.deleteLater()
+
+
     def cancel_segmentation(self):
         """ Попытка отмены текущей сегментации объема. """
         logger.info("Попытка отмены сегментации...")
-        if self.segmentation_worker is not None:
-            self.segmentation_worker.cancel()
-        # Затем пытаемся завершить поток
-        if self.segmentation_thread is not None and self.segmentation_thread.isRunning():
-             logger.info("Завершаем поток сегментации...")
-             self.segmentation_thread.quit()
+        if self.segmentation_worker is not None or self.segmentation_thread is not None:
+            # Отмена воркера и завершение потока выполняются в пуле отмены, не блокируя GUI
+            self._cancel_pool.start(SegmentationCancelTask(self.segmentation_worker, self.segmentation_thread))
+            # Если сегментатор не проверяет флаг отмены, воркер прерывается принудительно между вызовами Python
+            # (длительный вызов в C/PyTorch так не прервать - исключение доставляется после его возврата)
+            if self.segmentation_worker is not None:
+                self._escalate_cancel_worker = self.segmentation_worker
+                self._escalate_cancel_timer.start()
 
         if self.progress_dialog:
             self.progress_dialog.setLabelText("Отмена сегментации...")
 
 
+    def _escalate_cancel(self):
+        """ Принудительно прерывает воркер сегментации, если он все еще выполняется после отмены. """
+        worker = self._escalate_cancel_worker
+        self._escalate_cancel_worker = None
+        if worker is not None and worker.force_cancel():
+            logger.warning("Воркер сегментации не завершился после отмены, прерываем принудительно.")
+
+
     def _clear_segmentation_thread_refs(self):
         """ Очищает ссылки на поток и воркер сегментации, если они существуют. """
         logger.debug("Очистка ссылок на поток и воркер сегментации.")
 
-        # Отключаем сигналы воркера, если он еще существует
-        if self.segmentation_worker:
-             try: self.segmentation_worker.progress.disconnect(self._on_full_segmentation_progress)
-             except (TypeError, RuntimeError): pass 
-             try: self.segmentation_worker.finished.disconnect(self._on_full_segmentation_finished)
-             except (TypeError, RuntimeError): pass
-             try: self.segmentation_worker.error.disconnect(self._on_segmentation_error)
-             except (TypeError, RuntimeError): pass
-             # Отключаем сигнал deleteLater, если он был подключен
-             try: self.segmentation_worker.finished.disconnect(self.segmentation_worker.deleteLater)
-             except (TypeError, RuntimeError): pass
-
-        # Отключаем сигналы потока, если он еще существует
-        if self.segmentation_thread:
-            try: self.segmentation_thread.started.disconnect(self.segmentation_worker.run)
-            except (TypeError, RuntimeError): pass # Может вызвать ошибку, если worker уже удален
-            try: self.segmentation_thread.finished.disconnect(self.segmentation_thread.deleteLater)
-            except (TypeError, RuntimeError): pass
-            try: self.segmentation_thread.finished.disconnect(self._clear_segmentation_thread_refs)
-            except (TypeError, RuntimeError): pass # Убрали рекурсивный вызов, но оставим disconnect на всякий случай
+        # Отключаем сохраненные подключения к слотам панели: QObject.disconnect(connection) не бросает исключений,
+        # если подключение уже разорвано или объект удален
+        for connection in self._segmentation_connections:
+             QObject.disconnect(connection)
+        self._segmentation_connections = []
+
+        # Завершившийся воркер прерывать уже не нужно (выполняющийся - например, после неудачного wait() - нужно)
+        worker = self._escalate_cancel_worker
+        if worker is None or worker.thread_ident is None:
+            self._escalate_cancel_timer.stop()
+            self._escalate_cancel_worker = None
 
         self.segmentation_thread = None
         self.segmentation_worker = None
@@ -1038,42 +2095,122 @@ class ViewerPanel(QWidget):
 
     def _update_mask_overlay(self):
         """ Обновляет отображение маски сегментации. """
-        if (self.full_segmentation_mask_volume is not None and self.segment_checkbox.isChecked()) or \
-           (self.segmentation_mask is not None and self.full_segmentation_mask_volume is None): # Отображаем временную маску, если нет полной
-            mask_to_display = None
-            if self.full_segmentation_mask_volume is not None and self.segment_checkbox.isChecked():
-                 # Берем срез из полной маски
-                 if self.current_slice_index < self.full_segmentation_mask_volume.shape[0]:
-                      mask_to_display = self.full_segmentation_mask_volume[self.current_slice_index]
-                 else:
-                      logger.warning(f"Индекс среза {self.current_slice_index} вне диапазона полной маски {self.full_segmentation_mask_volume.shape[0]}. Полная маска не отображена.")
-            elif self.segmentation_mask is not None and self.full_segmentation_mask_volume is None:
-                 # Используем временную маску среза, если нет полной маски
-                 mask_to_display = self.segmentation_mask
-
-
-            if mask_to_display is not None:
-                 self.mask_item.setImage(mask_to_display.T, autoLevels=False, levels=(0, 1)) # Транспонируем
-                 self.mask_item.setVisible(True)
-                 # Убеждаемся, что маска выравнивается с изображением
-                 img_bounds = self.img_item.boundingRect()
-                 if img_bounds:
-                     self.mask_item.setPos(img_bounds.topLeft())
-                     self.mask_item.setTransform(self.img_item.transform())
-            else:
-                 # Если маска для отображения не определена
-                 self.mask_item.clear()
-                 self.mask_item.setVisible(False)
+        # Состояние, от которого зависит оверлей; если оно не изменилось - ничего не делаем
+        mask_meta = self._mask_meta
+        show_full = mask_meta is not None and self.segment_checkbox.isChecked()
+        state = (self.current_slice_index if show_full else None, mask_meta[2] if mask_meta is not None else None, id(self.segmentation_mask), show_full)
+        if state == self._overlay_state:
+            return
+        self._overlay_state = state
+
+        # Полная маска совмещается с самим срезом в img_item (см. _show_slice_image), mask_item не нужен
+        fused_mask = self._fused_mask_slice()
+        if self._overlay_fused != (fused_mask is not None) and self._display_buf is not None:
+            self._show_slice_image(fused_mask)
+        if show_full:
+            if fused_mask is None:
+                 logger.warning(f"Индекс среза {self.current_slice_index} вне диапазона полной маски {mask_meta[0][0]}. Полная маска не отображена.")
+            self._hide_mask_overlay()
+            return
 
+        if self.segmentation_mask is not None and mask_meta is None:
+            # Временная маска среза (нет полной маски): отдельный слой mask_item в порядке строк (H, W), как и img_item
+            self._show_image_buffer(self.mask_item, self._fill_mask_buffer(self.segmentation_mask), autoLevels=False, levels=None)
+            self.mask_item.setVisible(True)
+            # Убеждаемся, что маска выравнивается с изображением (setPos/setTransform - только при изменении,
+            # каждый вызов инвалидирует геометрию элемента на сцене)
+            img_bounds = self.img_item.boundingRect()
+            if img_bounds:
+                top_left = img_bounds.topLeft()
+                if self.mask_item.pos() != top_left:
+                    self.mask_item.setPos(top_left)
+                img_transform = self.img_item.transform()
+                if self.mask_item.transform() != img_transform:
+                    self.mask_item.setTransform(img_transform)
         else:
             # Скрываем маску, если нет данных полной маски И нет временной маски ИЛИ (есть полная маска, но чекбокс выключен)
-            self.mask_item.clear()
-            self.mask_item.setVisible(False)
+            self._hide_mask_overlay()
+
+    def _fused_mask_slice(self):
+        """
+        Возвращает срез полной маски для совмещения с текущим срезом или None,
+        если полной маски нет, ее отображение выключено или срез вне ее диапазона.
+        """
+        mask_meta = self._mask_meta
+        if mask_meta is None or not self.segment_checkbox.isChecked():
+            return None
+        if self.current_slice_index >= mask_meta[0][0]:
+            return None
+        return self.full_segmentation_mask_volume.slice_view(self.current_slice_index)
+
+    def _show_slice_image(self, fused_mask):
+        """
+        Показывает в img_item окно текущего среза (_display_buf) либо, если передан срез полной маски,
+        совмещенное с ней RGB изображение. Совмещение - одна выборка из _FUSED_OVERLAY_LUT
+        в постоянный буфер вместо второго слоя, смешиваемого при каждой отрисовке.
+
+        Args:
+            fused_mask (np.ndarray): Срез полной маски uint8 (H, W) со значениями 0/1 или None.
+        """
+        gray = self._display_buf
+        if fused_mask is None or fused_mask.shape != gray.shape:
+            self._overlay_fused = False
+            self._show_image_buffer(self.img_item, gray, autoLevels=False, levels=None)
+            return
+        if self._fused_index_buf is None or self._fused_index_buf.shape != gray.shape:
+            self._fused_index_buf = np.empty(gray.shape, dtype=np.uint16)
+            self._fused_rgb_buf = np.empty(gray.shape + (3,), dtype=np.uint8)
+        index = self._fused_index_buf
+        np.left_shift(fused_mask, 8, out=index, dtype=np.uint16)
+        np.add(index, gray, out=index)
+        np.take(_FUSED_OVERLAY_LUT, index, axis=0, out=self._fused_rgb_buf, mode='clip')
+        self._overlay_fused = True
+        self._show_image_buffer(self.img_item, self._fused_rgb_buf, autoLevels=False, levels=None)
+
+    def _set_full_mask_volume(self, volume):
+        """
+        Устанавливает полную маску сегментации.
+        Бинарная маска хранится упакованной (1 бит на воксель, PackedMaskVolume),
+        срезы распаковываются по запросу. SegmentationWorker передает уже упакованную маску.
+        """
+        if volume is None:
+            self.full_segmentation_mask_volume = None
+            self._mask_meta = None
+        else:
+            self.full_segmentation_mask_volume = volume if isinstance(volume, PackedMaskVolume) else PackedMaskVolume(volume)
+            logger.debug(f"Полная маска сохранена: {self.full_segmentation_mask_volume.nbytes / 2**20:.1f} МБ")
+            self._mask_meta = (self.full_segmentation_mask_volume.shape, self.full_segmentation_mask_volume.dtype, id(self.full_segmentation_mask_volume))
+        self._overlay_state = None
+
+    def _hide_mask_overlay(self):
+        """ Скрывает оверлей маски. """
+        self.mask_item.clear()
+        self.mask_item.setVisible(False)
+
+    def _fill_mask_buffer(self, mask):
+        """
+        Возвращает маску среза в виде непрерывного uint8 массива (H, W) для оверлея.
+        Маска среза из LungSegmenter.predict уже в этом виде (в порядке строк, как mask_item) и передается
+        без копирования, остальные маски копируются в постоянный буфер (выделяется заново только при изменении размера).
+
+        Args:
+            mask (np.ndarray): 2D бинарная маска среза [H, W] (значения 0/1).
+
+        Returns:
+            np.ndarray: uint8 массив [H, W].
+        """
+        if mask.dtype == np.uint8 and mask.flags.c_contiguous:
+            return mask
+        if self._mask_buf is None or self._mask_buf.shape != mask.shape:
+            self._mask_buf = np.empty(mask.shape, dtype=np.uint8)
+        np.copyto(self._mask_buf, mask, casting='unsafe')
+        return self._mask_buf
 
     def _set_segmentation_controls_enabled(self, enabled):
         """ Временно включает/отключает кнопки сегментации (не чекбокс). """
         # Получаем текущее состояние доступности кнопок на основе наличия модели и данных
-        model_is_loaded = SEGMENTATION_AVAILABLE and self.segmenter is not None and self.segmenter.model is not None
+        model_is_loaded = SEGMENTATION_AVAILABLE and self.segmenter is not None and self.segmenter.model is not None and self.model_load_thread is None \
+                          and self._single_segmentation_request is None
         data_is_loaded = self.current_volume_hu is not None
         can_segment = model_is_loaded and data_is_loaded
 
@@ -1082,25 +2219,42 @@ class ViewerPanel(QWidget):
 
     def _on_mouse_moved(self, pos):
         """
-        Обработчик движения мыши для отображения HU и обновления текущего измерения.
-        Позиция 'pos' находится в координатах сцены (graphics_widget).
+        Обработчик движения мыши. Запоминает последнюю позицию (в координатах сцены)
+        и откладывает обработку до срабатывания таймера, объединяя частые события.
         """
+        self._pending_hover_pos = pos
+        if not self._hover_timer.isActive():
+            self._hover_timer.start()
 
-        pos_in_img_item = self.img_item.mapFromScene(pos)
-
+    def _flush_hover(self):
+        """
+        Отображает HU и обновляет текущее измерение для последней позиции мыши.
+        Позиция находится в координатах сцены (graphics_widget).
+        """
+        pos = self._pending_hover_pos
+        if pos is None:
+            return
 
-        x = int(pos_in_img_item.x())
-        y = int(pos_in_img_item.y())
+        a, b, c, d, tx, ty = self._scene_to_img or self._update_scene_to_img()
+        pos_x = pos.x()
+        pos_y = pos.y()
+        x = int(a * pos_x + c * pos_y + tx)
+        y = int(b * pos_x + d * pos_y + ty)
 
         # Получаем размеры текущего среза (height, width)
-        height, width = self.current_pixel_data_hu.shape if self.current_pixel_data_hu is not None else (0, 0)
+        height, width = self._hu_h, self._hu_w
 
-        # Обновление HU Label 
-        if self.current_pixel_data_hu is not None and 0 <= y < height and 0 <= x < width:
+        # Обновление HU Label (только если курсор перешел на другой пиксель или сменились данные среза)
+        in_image = bool(height) and 0 <= y < height and 0 <= x < width
+        hu_pixel = (x, y) if in_image else (-1, -1) # (-1, -1) - курсор вне изображения
+        if hu_pixel == self._last_hu_pixel:
+            pass
+        elif in_image:
+            self._last_hu_pixel = hu_pixel
             try:
                 # Получаем значение HU из исходных данных по индексам [строка, столбец]
-                hu_value = self.current_pixel_data_hu[y, x]
-                self.hu_label.setText(f"HU: {hu_value:.1f}") # Форматируем до 1 знака после запятой
+                hu_value = self._hu_mv[y, x]
+                self.hu_label.setText(_HU_FMT(hu_value)) # Форматируем до 1 знака после запятой
             except IndexError:
                  # Этого не должно произойти, если проверки границ выше верны,
                  # но на всякий случай обрабатываем
@@ -1110,23 +2264,30 @@ class ViewerPanel(QWidget):
                  self.hu_label.setText("HU: Ошибка")
         else:
             # Если курсор вне изображения или нет данных
+            self._last_hu_pixel = hu_pixel
             self.hu_label.setText("HU: N/A (вне изображения)")
 
         if self._measurement_mode_active and self._measurement_start_point is not None and self._current_measurement_item is not None:
-            end_point_data = QPointF(x, y)
-
-            self._current_measurement_item['line'].setData([self._measurement_start_point.x(), end_point_data.x()],
-                                                          [self._measurement_start_point.y(), end_point_data.y()])
-
-            distance_mm = self._calculate_distance_mm(self._measurement_start_point, end_point_data)
-            self._current_measurement_item['text'].setHtml(f"<div style='text-align: center; color: white; background-color: rgba(0,0,0,100); padding: 2px;'>{distance_mm:.1f} mm</div>")
-
-
-            text_pos_x = (self._measurement_start_point.x() + end_point_data.x()) / 2.0
-            text_pos_y = (self._measurement_start_point.y() + end_point_data.y()) / 2.0
-            offset_x = 5 
-            offset_y = 5 
-            self._current_measurement_item['text'].setPos(text_pos_x + offset_x, text_pos_y + offset_y)
+            measure_key = (x, y, self._current_measurement_item)
+            if measure_key == self._last_measure_key:
+                return
+            self._last_measure_key = measure_key
+            start_point = self._measurement_start_point
+            sx = start_point.x()
+            sy = start_point.y()
+            line_x = self._line_x
+            line_y = self._line_y
+            line_x[0] = sx
+            line_x[1] = x
+            line_y[0] = sy
+            line_y[1] = y
+            self._current_measurement_item.line.setData(x=line_x, y=line_y)
+
+            distance_mm = math.hypot((x - sx) * self._col_spacing, (y - sy) * self._row_spacing)
+            text_item = self._current_measurement_item.text
+            text_item.setText(_DISTANCE_FMT(distance_mm))
+            # Подпись в середине линии со смещением 5 пикселей
+            text_item.setPos((sx + x) / 2.0 + 5, (sy + y) / 2.0 + 5)
 
 
     @pyqtSlot(object) 
@@ -1149,10 +2310,8 @@ class ViewerPanel(QWidget):
                  logger.debug("Отмена текущего измерения (клик не левой кнопкой).")
                  self._measurement_start_point = None
                  if self._current_measurement_item:
-                      # Удаляем временные элементы с ViewBox
-                      self.view_box.removeItem(self._current_measurement_item['line'])
-                      self.view_box.removeItem(self._current_measurement_item['text'])
-                      self._current_measurement_item = None
+                      # Удаляем временные элементы со сцены
+                      self._discard_current_measurement()
                  event.accept() # Принимаем событие, чтобы оно не обрабатывалось далее
                  return
             event.ignore() # Игнорируем, чтобы не было неожиданного поведения
@@ -1163,22 +2322,20 @@ class ViewerPanel(QWidget):
 
         # Логика для режима измерения 
         if self._measurement_mode_active:
-            click_pos_data = self.img_item.mapFromScene(click_pos_scene)
+            click_x, click_y = self._map_scene_to_image(click_pos_scene)
 
-            x = int(click_pos_data.x())
-            y = int(click_pos_data.y())
+            x = int(click_x)
+            y = int(click_y)
 
-            height, width = self.current_pixel_data_hu.shape if self.current_pixel_data_hu is not None else (0, 0)
-            if not (0 <= y < height and 0 <= x < width):
+            height, width = self._hu_h, self._hu_w
+            if not (height and 0 <= y < height and 0 <= x < width):
                  logger.debug("Клик вне границ изображения в режиме измерения.")
 
                  if self._measurement_mode_active and self._measurement_start_point is not None:
                       logger.debug("Отмена текущего измерения (клик вне изображения).")
                       self._measurement_start_point = None
                       if self._current_measurement_item:
-                           self.view_box.removeItem(self._current_measurement_item['line'])
-                           self.view_box.removeItem(self._current_measurement_item['text'])
-                           self._current_measurement_item = None
+                           self._discard_current_measurement()
                       # Снимаем выделение с любого выбранного измерения при выходе из режима рисования
                       self._deselect_measurement()
                       event.accept()
@@ -1190,44 +2347,63 @@ class ViewerPanel(QWidget):
 
             # Если это первый клик, сохраняем начальную точку и создаем временные элементы
             if self._measurement_start_point is None:
-                logger.debug(f"Начало измерения в ({x}, {y}) (пиксели изображения)")
+                logger.debug("Начало измерения в (%d, %d) (пиксели изображения)", x, y)
                 self._measurement_start_point = QPointF(x, y)
 
                 line_item = pg.PlotCurveItem([x, x], [y, y], pen=pg.mkPen('yellow', width=2))
-                text_item = pg.TextItem("0.0 mm", color='white', anchor=(0.5, 0.5))
-                text_item.setPos(x, y)
+                # Временные элементы прикрепляются к слою измерений, без ViewBox.addItem
+                # (addItem/removeItem пересчитывают автомасштаб, который от измерений не зависит)
+                line_item.setParentItem(self._measurement_layer)
+                text_item = self._create_measurement_text("0.0 mm", (x, y), self._measurement_layer)
 
-                self.view_box.addItem(line_item)
-                self.view_box.addItem(text_item)
-
-                self._current_measurement_item = {'line': line_item, 'text': text_item}
+                self._current_measurement_item = MeasurementRecord(line_item, text_item)
 
             else:
-                logger.debug(f"Конец измерения в ({x}, {y}) (пиксели изображения)")
+                logger.debug("Конец измерения в (%d, %d) (пиксели изображения)", x, y)
                 end_point = QPointF(x, y)
 
-                self._current_measurement_item['line'].setData([self._measurement_start_point.x(), end_point.x()],
-                                                              [self._measurement_start_point.y(), end_point.y()])
-
                 # Рассчитываем окончательное расстояние
                 distance_mm = self._calculate_distance_mm(self._measurement_start_point, end_point)
-                logger.info(f"Измерение завершено. Расстояние: {distance_mm:.2f} mm")
-
-                # Обновляем текст с окончательным значением
-                self._current_measurement_item['text'].setHtml(f"<div style='text-align: center; color: white; background-color: rgba(0,0,0,100); padding: 2px;'>{distance_mm:.1f} mm</div>")
+                logger.info("Измерение завершено. Расстояние: %.2f mm", distance_mm)
 
+                # Обновляем текст с окончательным значением; подпись и ее позиция сохраняются
+                # в данных измерения, чтобы пересоздавать TextItem при возврате на срез
+                label = _DISTANCE_FMT(distance_mm)
                 text_pos_x = (self._measurement_start_point.x() + end_point.x()) / 2.0
                 text_pos_y = (self._measurement_start_point.y() + end_point.y()) / 2.0
                 offset_x = 5 
                 offset_y = 5 
-                self._current_measurement_item['text'].setPos(text_pos_x + offset_x, text_pos_y + offset_y)
+                text_pos = (text_pos_x + offset_x, text_pos_y + offset_y)
+                measurement = self._current_measurement_item
+                measurement.label = label
+                measurement.text_pos = text_pos
 
 
+                # Временная линия заменяется отрезком в общей кривой среза, временная подпись - записью в подписях среза
+                self._remove_scene_item(measurement.line)
+                self._remove_scene_item(measurement.text)
+                measurement.line = measurement.text = None
+
                 # Сохраняем завершенное измерение в списке для текущего среза
-                if self.current_slice_index not in self._measurements_by_slice:
-                     self._measurements_by_slice[self.current_slice_index] = []
-                self._measurements_by_slice[self.current_slice_index].append(self._current_measurement_item)
-                logger.debug(f"Измерение сохранено для среза {self.current_slice_index}. Всего на срезе: {len(self._measurements_by_slice[self.current_slice_index])}")
+                measurement_id = next(self._measurement_id_counter)
+                measurement.id = measurement_id
+                measurement.points = (self._measurement_start_point.x(), self._measurement_start_point.y(), end_point.x(), end_point.y())
+                self._measurements_by_slice.setdefault(self.current_slice_index, {})[measurement_id] = measurement
+                self._measurement_slice_by_id[measurement_id] = self.current_slice_index
+                self._measurement_labels(self.current_slice_index).add_label(measurement_id, label, text_pos)
+                endpoints = np.array([measurement.points], dtype=np.float32)
+                ids = np.array([measurement_id], dtype=np.int64)
+                slice_endpoints = self._measurement_endpoints_by_slice.get(self.current_slice_index)
+                if slice_endpoints is None:
+                     self._measurement_endpoints_by_slice[self.current_slice_index] = endpoints
+                     self._measurement_ids_by_slice[self.current_slice_index] = ids
+                else:
+                     self._measurement_endpoints_by_slice[self.current_slice_index] = np.vstack((slice_endpoints, endpoints))
+                     self._measurement_ids_by_slice[self.current_slice_index] = np.concatenate((self._measurement_ids_by_slice[self.current_slice_index], ids))
+                self._measurement_geometry_by_slice.pop(self.current_slice_index, None)
+                self._update_measurement_curve(self.current_slice_index)
+                self._set_measurement_count(self.current_slice_index, self._measurement_counts.get(self.current_slice_index, 0) + 1)
+                logger.debug("Измерение сохранено для среза %d. Всего на срезе: %d", self.current_slice_index, self._measurement_counts[self.current_slice_index])
 
 
                 # Сбрасываем переменные для нового измерения
@@ -1242,29 +2418,15 @@ class ViewerPanel(QWidget):
             event.accept() 
 
         else:
-            # Получаем список элементов сцены под курсором
-            items_at_pos = self.view_box.scene().items(click_pos_scene)
-            logger.debug(f"Items at click position: {items_at_pos}")
-
-            selected_measurement = None
-            # Проходим по всем элементам под курсором
-            for item in items_at_pos:
-
-                 current_slice_measurements = self._measurements_by_slice.get(self.current_slice_index, [])
-                 for measurement in current_slice_measurements:
-                      if item == measurement['line']:
-                           selected_measurement = measurement
-                           break 
-                 if selected_measurement:
-                      break 
+            # Ищем измерение под курсором
+            selected_measurement = self._find_measurement_at(click_pos_scene)
 
             self._deselect_measurement()
 
             if selected_measurement:
                  logger.debug("Выбрано измерение для удаления.")
-                 self._selected_measurement_item = selected_measurement
-                 # Визуально выделяем линию (например, меняем цвет или толщину)
-                 self._selected_measurement_item['line'].setPen(pg.mkPen('cyan', width=3)) 
+                 # Визуально выделяем линию
+                 self._select_measurement(selected_measurement)
                  
                  self.setFocus()
                  event.accept() 
@@ -1275,6 +2437,75 @@ class ViewerPanel(QWidget):
             return 
 
 
+    def _find_measurement_at(self, scene_pos):
+        """
+        Находит измерение текущего среза, ближайшее к точке сцены, в пределах допуска.
+        Расстояния от точки до всех отрезков считаются одной векторной операцией.
+
+        Args:
+            scene_pos (QPointF): Точка в координатах сцены.
+
+        Returns:
+            MeasurementRecord: Найденное измерение или None.
+        """
+        endpoints = self._measurement_endpoints_by_slice.get(self.current_slice_index)
+        if endpoints is None or len(endpoints) == 0:
+            return None
+        geometry = self._measurement_geometry_by_slice.get(self.current_slice_index)
+        if geometry is None:
+            # Начала отрезков, векторы отрезков и обратные квадраты длин считаются один раз до изменения среза
+            start = endpoints[:, :2]
+            segment = endpoints[:, 2:] - start
+            geometry = (start, segment, 1.0 / np.maximum((segment * segment).sum(axis=1), 1e-12))
+            self._measurement_geometry_by_slice[self.current_slice_index] = geometry
+        start, segment, inv_len2 = geometry
+
+        a, b = (self._scene_to_img or self._update_scene_to_img())[:2]
+        # Переводим допуск из пикселей экрана в пиксели изображения
+        tolerance = math.hypot(a, b) * MEASUREMENT_PICK_TOLERANCE_PX
+
+        point = np.array(self._map_scene_to_image(scene_pos), dtype=np.float32)
+        t = np.clip(((point - start) * segment).sum(axis=1) * inv_len2, 0.0, 1.0)
+        dist2 = ((start + t[:, None] * segment - point) ** 2).sum(axis=1)
+        nearest = int(dist2.argmin())
+        if dist2[nearest] > tolerance * tolerance:
+            return None
+        measurement_id = int(self._measurement_ids_by_slice[self.current_slice_index][nearest])
+        return self._measurements_by_slice[self.current_slice_index].get(measurement_id)
+
+    def _invalidate_scene_to_img(self, *args):
+        """ Сбрасывает кэш преобразования сцена -> изображение. """
+        self._scene_to_img = None
+
+    def _update_scene_to_img(self):
+        """
+        Вычисляет и кэширует аффинное преобразование из координат сцены в пиксели изображения.
+
+        Returns:
+            tuple: (a, b, c, d, tx, ty), где x_img = a*x + c*y + tx, y_img = b*x + d*y + ty.
+        """
+        inverse, invertible = self.img_item.sceneTransform().inverted()
+        if not invertible:
+            # Вырожденное преобразование (например, ViewBox еще не имеет размера) - не кэшируем
+            return (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+        self._scene_to_img = (inverse.m11(), inverse.m12(), inverse.m21(), inverse.m22(), inverse.dx(), inverse.dy())
+        return self._scene_to_img
+
+    def _map_scene_to_image(self, scene_pos):
+        """
+        Переводит точку сцены в координаты изображения через кэшированное преобразование.
+
+        Args:
+            scene_pos (QPointF): Точка в координатах сцены.
+
+        Returns:
+            tuple: (x, y) в пикселях изображения (float).
+        """
+        a, b, c, d, tx, ty = self._scene_to_img or self._update_scene_to_img()
+        pos_x = scene_pos.x()
+        pos_y = scene_pos.y()
+        return (a * pos_x + c * pos_y + tx, b * pos_x + d * pos_y + ty)
+
     def _on_measurement_hover(self, event, measurement_item):
         """ Обработчик наведения мыши на линию измерения. """
         if event.isEnter():
@@ -1287,11 +2518,93 @@ class ViewerPanel(QWidget):
         """ Снимает выделение с текущего выбранного измерения. """
         if self._selected_measurement_item:
             logger.debug("Снятие выделения с измерения.")
-            self._selected_measurement_item['line'].setPen(pg.mkPen('yellow', width=2))
             self._selected_measurement_item = None
+            self._selection_curve.setVisible(False)
             self._update_measurement_controls_state()
 
 
+    def _select_measurement(self, measurement):
+        """ Выделяет измерение, накладывая на его отрезок кривую подсветки. """
+        self._selected_measurement_item = measurement
+        x1, y1, x2, y2 = measurement.points
+        self._selection_curve.setData([x1, x2], [y1, y2])
+        self._selection_curve.setVisible(True)
+
+    def _measurement_group(self, slice_index: int):
+        """
+        Возвращает группу графических элементов измерений среза, создавая ее при необходимости.
+        Группа - дочерний элемент слоя измерений внутри childGroup ViewBox, поэтому элементы в ней используют координаты изображения.
+        """
+        group = self._measurement_groups_by_slice.get(slice_index)
+        if group is None:
+            group = QGraphicsItemGroup()
+            group.setParentItem(self._measurement_layer)
+            group.setVisible(slice_index == self.current_slice_index)
+            self._measurement_groups_by_slice[slice_index] = group
+        return group
+
+    def _create_measurement_text(self, label: str, pos, parent):
+        """
+        Создает подпись измерения.
+
+        Args:
+            label (str): Текст подписи.
+            pos (tuple): Позиция (x, y) в пикселях изображения.
+            parent (QGraphicsItem): Родительский элемент (слой измерений или группа среза).
+
+        Returns:
+            pg.TextItem: Созданная подпись.
+        """
+        # Полупрозрачный фон задается кистью один раз, текст обновляется через setText без HTML
+        text_item = pg.TextItem(label, color='white', fill=pg.mkBrush(0, 0, 0, 100), anchor=(0.5, 0.5))
+        text_item.setPos(*pos)
+        text_item.setParentItem(parent)
+        return text_item
+
+    def _discard_current_measurement(self):
+        """ Удаляет временные элементы незавершенного измерения со сцены. """
+        self._remove_scene_item(self._current_measurement_item.line)
+        self._remove_scene_item(self._current_measurement_item.text)
+        self._current_measurement_item = None
+
+    def _remove_scene_item(self, item):
+        """
+        Удаляет элемент (вместе с дочерними) со сцены ViewBox.
+        Принадлежность сцене проверяется через item.scene() за O(1), без поиска в view_box.addedItems.
+        """
+        scene = self.view_box.scene()
+        try:
+            if scene is not None and item.scene() is scene:
+                scene.removeItem(item)
+        except RuntimeError:
+            pass # C++ объект уже удален
+
+    def _measurement_labels(self, slice_index: int):
+        """ Возвращает элемент подписей измерений среза, создавая его в группе среза при необходимости. """
+        labels_item = self._measurement_labels_by_slice.get(slice_index)
+        if labels_item is None:
+            labels_item = MeasurementLabelsItem()
+            labels_item.setParentItem(self._measurement_group(slice_index))
+            self._measurement_labels_by_slice[slice_index] = labels_item
+        return labels_item
+
+    def _update_measurement_curve(self, slice_index: int):
+        """
+        Перестраивает общую кривую отрезков измерений среза из массива концов отрезков.
+        Все линии среза рисуются одним PlotCurveItem с connect='pairs'.
+        """
+        curve = self._measurement_curves_by_slice.get(slice_index)
+        if curve is None:
+            curve = pg.PlotCurveItem(pen=pg.mkPen('yellow', width=2))
+            curve.setParentItem(self._measurement_group(slice_index))
+            self._measurement_curves_by_slice[slice_index] = curve
+        endpoints = self._measurement_endpoints_by_slice.get(slice_index)
+        if endpoints is None or len(endpoints) == 0:
+            curve.setData([], [])
+        else:
+            # Строки (x1, y1, x2, y2) -> x: x1, x2, x1', x2', ...; y аналогично
+            curve.setData(x=endpoints[:, 0::2].ravel(), y=endpoints[:, 1::2].ravel(), connect='pairs')
+
     def _delete_selected_measurement(self):
         """ Удаляет текущее выбранное измерение. """
         logger.debug("Попытка удаления выбранного измерения.")
@@ -1299,25 +2612,28 @@ class ViewerPanel(QWidget):
             logger.info("Удаление выбранного измерения.")
             try:
 
-                self.view_box.removeItem(self._selected_measurement_item['line'])
-                self.view_box.removeItem(self._selected_measurement_item['text'])
+                labels_item = self._measurement_labels_by_slice.get(self._measurement_slice_by_id.get(self._selected_measurement_item.id))
+                if labels_item is not None:
+                     labels_item.remove_label(self._selected_measurement_item.id)
                 logger.debug("Элементы измерения удалены из ViewBox.")
 
 
-                current_slice_measurements = self._measurements_by_slice.get(self.current_slice_index, [])
-                index_to_remove = -1
-                for i, measurement in enumerate(current_slice_measurements):
-                     # Сравниваем по ссылке на словарь или по ссылкам на графические элементы внутри
-                     if measurement == self._selected_measurement_item:
-                          index_to_remove = i
-                          break
-                if index_to_remove != -1:
-                     del current_slice_measurements[index_to_remove]
-                     # Обновляем список измерений для среза в словаре
-                     self._measurements_by_slice[self.current_slice_index] = current_slice_measurements
-                     logger.debug(f"Измерение успешно удалено из списка для среза {self.current_slice_index}. Осталось: {len(current_slice_measurements)}")
+                # Срез измерения берется из обратного индекса, а не из текущего среза
+                measurement_id = self._selected_measurement_item.id
+                slice_index = self._measurement_slice_by_id.pop(measurement_id, None)
+                slice_measurements = self._measurements_by_slice.get(slice_index, {})
+                if slice_measurements.pop(measurement_id, None) is not None:
+                     self._set_measurement_count(slice_index, len(slice_measurements))
+                     slice_ids = self._measurement_ids_by_slice.get(slice_index)
+                     if slice_ids is not None:
+                          keep_rows = slice_ids != measurement_id
+                          self._measurement_ids_by_slice[slice_index] = slice_ids[keep_rows]
+                          self._measurement_endpoints_by_slice[slice_index] = self._measurement_endpoints_by_slice[slice_index][keep_rows]
+                          self._measurement_geometry_by_slice.pop(slice_index, None)
+                     self._update_measurement_curve(slice_index)
+                     logger.debug("Измерение успешно удалено из списка для среза %d. Осталось: %d", slice_index, len(slice_measurements))
                 else:
-                     logger.warning("Попытка удалить измерение, которое не найдено в списке для текущего среза.")
+                     logger.warning("Попытка удалить измерение, которое не найдено в списке измерений.")
 
 
             except Exception as e:
@@ -1325,36 +2641,76 @@ class ViewerPanel(QWidget):
             finally:
                 # Сбрасываем выбранное измерение
                 self._selected_measurement_item = None
+                self._selection_curve.setVisible(False)
                 # Обновляем состояние кнопки очистки измерений
                 self._update_measurement_controls_state()
         else:
             logger.debug("Нет выбранного измерения для удаления.")
 
 
+    @property
+    def current_slice_index(self):
+        """ Индекс текущего среза. """
+        return self._current_slice_index
+
+    @current_slice_index.setter
+    def current_slice_index(self, slice_index):
+        self._current_slice_index = slice_index
+        self._any_on_current = self._measurement_counts.get(slice_index, 0) > 0
+
+    def _set_measurement_count(self, slice_index: int, count: int):
+        """ Обновляет счетчик измерений среза и, для текущего среза, признак наличия измерений. """
+        if count > 0:
+            self._measurement_counts[slice_index] = count
+        else:
+            self._measurement_counts.pop(slice_index, None)
+        if slice_index == self._current_slice_index:
+            self._any_on_current = count > 0
+
+    @property
+    def current_pixel_data_hu(self):
+        """ HU данные текущего среза (rows, cols) или None. """
+        return self._current_pixel_data_hu
+
+    @current_pixel_data_hu.setter
+    def current_pixel_data_hu(self, data):
+        self._current_pixel_data_hu = data
+        # Кэшируем размеры среза для обработчиков мыши; (0, 0) означает отсутствие данных
+        self._hu_h, self._hu_w = data.shape if data is not None else (0, 0)
+        # memoryview для чтения одного значения HU без создания скаляра NumPy
+        self._hu_mv = memoryview(np.ascontiguousarray(data)) if data is not None else None
+        # Данные среза сменились - значение HU под курсором нужно показать заново
+        self._last_hu_pixel = None
+
+    @property
+    def pixel_spacing(self):
+        """ Pixel Spacing текущей серии (row, col) в мм. """
+        return self._pixel_spacing
+
+    @pixel_spacing.setter
+    def pixel_spacing(self, spacing):
+        row_spacing, col_spacing = spacing
+        self._pixel_spacing = (row_spacing, col_spacing)
+        # Кэшируем компоненты как float для горячего пути расчета расстояния
+        self._row_spacing = float(row_spacing)
+        self._col_spacing = float(col_spacing)
+
     def _calculate_distance_mm(self, point1: QPointF, point2: QPointF):
         """
         Рассчитывает расстояние между двумя точками в миллиметрах,
         используя Pixel Spacing.
         Точки должны быть в координатах изображения (пикселях).
         """
-        # Разница в пикселях
-        delta_x_pixels = point2.x() - point1.x()
-        delta_y_pixels = point2.y() - point1.y()
-        row_spacing, col_spacing = self.pixel_spacing
-
-        # Добавляем логирование для проверки значений
-        logger.debug(f"Calculating distance: Point1=({point1.x()}, {point1.y()}), Point2=({point2.x()}, {point2.y()})")
-        logger.debug(f"Pixel differences: delta_x={delta_x_pixels}, delta_y={delta_y_pixels}")
-        logger.debug(f"Pixel Spacing used: row_spacing={row_spacing}, col_spacing={col_spacing}")
-
         # Разница в миллиметрах
-        delta_x_mm = delta_x_pixels * col_spacing
-        delta_y_mm = delta_y_pixels * row_spacing
+        delta_x_mm = (point2.x() - point1.x()) * self._col_spacing
+        delta_y_mm = (point2.y() - point1.y()) * self._row_spacing
 
-        # Расстояние по теореме Пифагора
-        distance_mm = math.sqrt(delta_x_mm**2 + delta_y_mm**2)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Calculating distance: Point1=({point1.x()}, {point1.y()}), Point2=({point2.x()}, {point2.y()})")
+            logger.debug(f"Pixel Spacing used: row_spacing={self._row_spacing}, col_spacing={self._col_spacing}")
 
-        return distance_mm
+        # Расстояние по теореме Пифагора
+        return math.hypot(delta_x_mm, delta_y_mm)
 
     @pyqtSlot(bool)
     def toggle_measurement_mode(self, active: bool):
@@ -1375,9 +2731,7 @@ class ViewerPanel(QWidget):
             # Сбрасываем начальную точку и временный элемент на всякий случай
             self._measurement_start_point = None
             if self._current_measurement_item:
-                 self.view_box.removeItem(self._current_measurement_item['line'])
-                 self.view_box.removeItem(self._current_measurement_item['text'])
-                 self._current_measurement_item = None
+                 self._discard_current_measurement()
             # Снимаем выделение с любого выбранного измерения при входе в режим рисования
             self._deselect_measurement()
 
@@ -1390,39 +2744,42 @@ class ViewerPanel(QWidget):
             # Сбрасываем начальную точку и временный элемент, если они остались
             self._measurement_start_point = None
             if self._current_measurement_item:
-                 self.view_box.removeItem(self._current_measurement_item['line'])
-                 self.view_box.removeItem(self._current_measurement_item['text'])
-                 self._current_measurement_item = None
+                 self._discard_current_measurement()
             # Снимаем выделение с любого выбранного измерения при выходе из режима рисования
             self._deselect_measurement()
 
 
-        # Обновляем состояние кнопки очистки измерений
+        # Обновляем состояние кнопки очистки измерений и оповещаем MainWindow об изменении режима
         self._update_measurement_controls_state()
-        # Оповещаем MainWindow об изменении состояния режима
-        self.measurement_state_changed.emit(self.current_volume_hu is not None, self._measurement_mode_active, len(self._measurements_by_slice.get(self.current_slice_index, [])) > 0)
 
 
     @pyqtSlot()
     def _clear_measurements_on_slice(self, slice_index: int):
         """ Удаляет все измерения с указанного среза с ViewBox и очищает список для этого среза. """
-        logger.info(f"Очистка измерений на срезе {slice_index}.")
-        measurements_to_clear = self._measurements_by_slice.get(slice_index, [])
-        for measurement in measurements_to_clear:
-             # Проверяем, что элементы еще существуют в ViewBox перед удалением
-             if measurement['line'] in self.view_box.addedItems:
-                  self.view_box.removeItem(measurement['line'])
-             if measurement['text'] in self.view_box.addedItems:
-                  self.view_box.removeItem(measurement['text'])
+        logger.info("Очистка измерений на срезе %d.", slice_index)
+        # Все элементы измерений среза лежат в одной группе - удаляем ее со сцены одним вызовом
+        group = self._measurement_groups_by_slice.pop(slice_index, None)
+        if group is not None:
+             self._remove_scene_item(group)
+
+        self._hot_slices.pop(slice_index, None)
 
         # Удаляем список измерений для этого среза из словаря
+        self._measurement_endpoints_by_slice.pop(slice_index, None)
+        self._measurement_ids_by_slice.pop(slice_index, None)
+        self._measurement_geometry_by_slice.pop(slice_index, None)
+        self._measurement_curves_by_slice.pop(slice_index, None)
+        self._measurement_labels_by_slice.pop(slice_index, None)
+        self._set_measurement_count(slice_index, 0)
         if slice_index in self._measurements_by_slice:
-             del self._measurements_by_slice[slice_index]
-             logger.debug(f"Измерения для среза {slice_index} удалены из словаря.")
+             for measurement_id in self._measurements_by_slice.pop(slice_index):
+                  self._measurement_slice_by_id.pop(measurement_id, None)
+             logger.debug("Измерения для среза %d удалены из словаря.", slice_index)
 
         # Если очищается текущий срез, сбрасываем выбранное измерение
         if slice_index == self.current_slice_index:
              self._selected_measurement_item = None
+             self._selection_curve.setVisible(False)
 
         # Обновляем состояние кнопки очистки измерений (для текущего среза)
         self._update_measurement_controls_state()
@@ -1431,30 +2788,85 @@ class ViewerPanel(QWidget):
     @pyqtSlot()
     def clear_all_measurements(self):
         """ Публичный слот для очистки всех измерений на текущем срезе. """
-        self._clear_measurements_on_slice(self.current_slice_index)
+        with self.batch_updates():
+             self._clear_measurements_on_slice(self.current_slice_index)
         logger.info("Вызван публичный метод clear_all_measurements для текущего среза.")
 
-    def _hide_measurements_on_slice(self, slice_index: int):
-        measurements_to_hide = self._measurements_by_slice.get(slice_index, [])
-        for measurement in measurements_to_hide:
-             if measurement['line'] in self.view_box.addedItems:
-                  measurement['line'].setVisible(False)
-             if measurement['text'] in self.view_box.addedItems:
-                  measurement['text'].setVisible(False)
-        logger.debug(f"Измерения на срезе {slice_index} скрыты.")
-
-    def _show_measurements_on_slice(self, slice_index: int):
-        measurements_to_show = self._measurements_by_slice.get(slice_index, [])
-        for measurement in measurements_to_show:
-             if measurement['line'] in self.view_box.addedItems:
-                  measurement['line'].setVisible(True)
-             if measurement['text'] in self.view_box.addedItems:
-                  measurement['text'].setVisible(True)
-        logger.debug(f"Измерения на срезе {slice_index} отображены. Количество: {len(measurements_to_show)}")
+    def _set_measurements_visible(self, slice_index: int, visible: bool):
+        """
+        Показывает или скрывает измерения среза.
+        Скрытая группа остается на сцене, пока срез среди недавно просмотренных,
+        показ создает кривую отрезков и подписи из сохраненных данных, если их еще нет на сцене.
 
+        Args:
+            slice_index (int): Индекс среза.
+            visible (bool): True - показать, False - скрыть.
+        """
+        groups = self._measurement_groups_by_slice
+        hot_slices = self._hot_slices
+        if not visible:
+             group = groups.get(slice_index)
+             if group is None:
+                  return
+             group.setVisible(False)
+             hot_slices[slice_index] = None
+             hot_slices.move_to_end(slice_index)
+             while len(hot_slices) > MEASUREMENT_SCENE_CACHE_SLICES:
+                  evicted_slice, _ = hot_slices.popitem(last=False)
+                  self._detach_measurements(evicted_slice)
+        else:
+             hot_slices.pop(slice_index, None)
+             group = groups.get(slice_index)
+             if group is not None:
+                  group.setVisible(True)
+                  return
+             measurements = self._measurements_by_slice.get(slice_index)
+             if not measurements:
+                  return
+             self._measurement_group(slice_index)
+             self._update_measurement_curve(slice_index)
+             self._measurement_labels(slice_index).set_labels(
+                  [(measurement.id, measurement.label, measurement.text_pos) for measurement in measurements.values()])
+        logger.debug("Измерения на срезе %d %s.", slice_index, "отображены" if visible else "скрыты")
+
+
+    def _detach_measurements(self, slice_index: int):
+        """ Удаляет группу элементов измерений среза со сцены. Данные измерений сохраняются. """
+        self._hot_slices.pop(slice_index, None)
+        group = self._measurement_groups_by_slice.pop(slice_index, None)
+        if group is None:
+             return
+        self._remove_scene_item(group)
+        self._measurement_curves_by_slice.pop(slice_index, None)
+        self._measurement_labels_by_slice.pop(slice_index, None)
+
+    @contextmanager
+    def batch_updates(self):
+        """
+        Объединяет оповещения о состоянии измерений внутри блока в одно.
+        Блоки могут быть вложенными; сигнал отправляется при выходе из внешнего блока.
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._update_measurement_controls_state()
 
     def _update_measurement_controls_state(self):
-        """ Обновляет состояние кнопки очистки измерений. """
-        has_measurements_on_current_slice = len(self._measurements_by_slice.get(self.current_slice_index, [])) > 0 or self._current_measurement_item is not None
+        """ Планирует обновление состояния кнопки очистки измерений (одно за проход цикла событий). """
+        if self._batch_depth > 0:
+            return
+        self._measurement_state_timer.start()
+
+    @pyqtSlot()
+    def _flush_measurement_state(self):
+        """ Вычисляет состояние измерений и оповещает MainWindow, если оно изменилось. """
+        has_measurements_on_current_slice = self._any_on_current or self._current_measurement_item is not None
         data_is_loaded = self.current_volume_hu is not None
-        self.measurement_state_changed.emit(data_is_loaded, self._measurement_mode_active, has_measurements_on_current_slice)
+        # Сигнал отправляется только при изменении состояния
+        state = (data_is_loaded, self._measurement_mode_active, has_measurements_on_current_slice)
+        if state != self._last_measurement_state:
+            self._last_measurement_state = state
+            self.measurement_state_changed.emit(*state)
@@ -40,25 +40,60 @@ class WindowPresets:
         Args:
             pixel_data: Массив пиксельных данных.
             center: Центр окна.
-            width: Ширина окна.
+            width: Ширина окна. При width <= 0 возвращается нулевое (черное) изображение.
             
         Returns:
             array: Преобразованные пиксельные данные.
         """
         import numpy as np
         
-        # Копируем данные, чтобы не изменять оригинал
-        result = pixel_data.copy()
+        pixel_data = np.asarray(pixel_data)
         
-        # Вычисляем границы окна
+        # Целые 1-2 байтовые данные - одна выборка из таблицы без промежуточных массивов
+        lut = WindowPresets.build_lut(pixel_data.dtype, center, width)
+        if lut is not None:
+            unsigned = np.ascontiguousarray(pixel_data).view('u%d' % pixel_data.dtype.itemsize)
+            return np.take(lut, unsigned, mode='clip')
+        
+        if width <= 0:
+            return np.zeros(pixel_data.shape, dtype=np.uint8)
+        
+        # Вычитание, масштаб и ограничение на месте в одном буфере (float32, для float64 данных - float64);
+        # порядок операций 255 * (x - min) / ширина тот же, что и в исходной формуле, результат совпадает побайтно
         min_val = center - width/2
-        max_val = center + width/2
+        result = np.subtract(pixel_data, min_val, dtype=np.result_type(pixel_data.dtype, np.float32))
+        np.multiply(result, 255.0, out=result)
+        np.divide(result, width, out=result)
+        np.clip(result, 0, 255, out=result)
+        
+        return result.astype(np.uint8)
+
+    @staticmethod
+    def build_lut(dtype, center, width):
+        """
+        Построение таблицы преобразования значений пикселей в яркость (0-255) для окна.
+        Таблица индексируется беззнаковым представлением пикселя (view как uint8/uint16),
+        поэтому применяется к срезу через np.take без промежуточных массивов.
+        
+        Args:
+            dtype: Тип пиксельных данных (целый, 1 или 2 байта).
+            center: Центр окна.
+            width: Ширина окна. При width <= 0 все значения таблицы нулевые.
+            
+        Returns:
+            array: Таблица uint8 длиной 2**(8 * itemsize) или None для неподдерживаемого типа.
+        """
+        import numpy as np
         
-        # Ограничиваем значения диапазоном окна
-        result = np.clip(result, min_val, max_val)
+        dtype = np.dtype(dtype)
+        if dtype.kind not in 'iu' or dtype.itemsize > 2:
+            return None
         
-        # Нормализуем значения для отображения (0-255)
-        if min_val != max_val:  # Избегаем деления на ноль
-            result = 255 * (result - min_val) / (max_val - min_val)
+        # Значения пикселей для каждого беззнакового индекса (для знаковых типов - дополнительный код)
+        index = np.arange(2 ** (8 * dtype.itemsize), dtype=np.uint64).astype('u%d' % dtype.itemsize)
+        values = index.view(dtype).astype(np.float64)
         
-        return result.astype(np.uint8)
\ No newline at end of file
+        if width <= 0:
+            return np.zeros(values.shape, dtype=np.uint8)
+        min_val = center - width/2
+        return np.clip(255.0 * (values - min_val) / width, 0, 255).astype(np.uint8)
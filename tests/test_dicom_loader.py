@@ -0,0 +1,109 @@
+"""Тесты вспомогательных функций загрузчика DICOM."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from pydicom.dataset import Dataset
+from pydicom.valuerep import DSfloat
+
+from pylungviewer.core.dicom_exporter import _normalize_to_uint8
+from pylungviewer.core.dicom_loader import _rescale_to_hu, _series_slice_order
+
+
+def _file_meta(instance_number, z=None, slice_location=0):
+    ds = Dataset()
+    if z is not None:
+        ds.ImagePositionPatient = [-100.0, -120.5, z]
+    return {'instance_number': instance_number, 'slice_location': slice_location, 'ds': ds}
+
+
+def test_slice_order_follows_z_position():
+    files = [_file_meta(1, 30.0), _file_meta(2, 10.0), _file_meta(3, 20.0)]
+    # Номера экземпляров не согласованы с z: срезы идут по позиции, от конца с экземпляром 1
+    order = _series_slice_order(files)
+    assert list(order) == [0, 2, 1]
+
+
+def test_slice_order_keeps_instance_number_direction():
+    # z убывает с ростом номера экземпляра (типичный КТ "голова вперед"): первым остается экземпляр 1
+    files = [_file_meta(3, -5.0), _file_meta(1, 5.0), _file_meta(2, 0.0)]
+    order = _series_slice_order(files)
+    assert [files[i]['instance_number'] for i in order] == [1, 2, 3]
+
+
+def test_slice_order_falls_back_without_positions():
+    files = [_file_meta('2', slice_location='7.5'), _file_meta('1', slice_location='3.0'), _file_meta('2', slice_location='-1')]
+    order = _series_slice_order(files)
+    assert list(order) == [1, 2, 0]
+
+
+def test_slice_order_malformed_tags_go_last():
+    # Некорректная позиция (как при чтении с force=True) - срезы сортируются по номеру экземпляра
+    ds = SimpleNamespace(ImagePositionPatient=['a', 'b', 'c'])
+    files = [{'instance_number': 'x', 'slice_location': 0, 'ds': ds}, _file_meta(2, 1.0), _file_meta(1, 2.0)]
+    order = _series_slice_order(files)
+    assert list(order) == [2, 1, 0]
+
+
+def test_slice_order_empty_series():
+    assert _series_slice_order([]).size == 0
+
+
+def _reference_hu(pixel_data, slope, intercept):
+    """Исходный пересчет load_pixel_data: умножение на DS теги в float64."""
+    return pixel_data * float(slope) + float(intercept)
+
+
+def test_rescale_uint16_integer_coefficients_gives_int16():
+    pixel_data = np.array([[0, 1024], [2047, 4095]], dtype=np.uint16)
+    hu = _rescale_to_hu(pixel_data, 1, -1024)
+    assert hu.dtype == np.int16
+    np.testing.assert_array_equal(hu, _reference_hu(pixel_data, 1, -1024))
+
+
+def test_rescale_int16_overflow_falls_back_to_float32():
+    pixel_data = np.array([-32768, 0, 32000], dtype=np.int16)
+    hu = _rescale_to_hu(pixel_data, 2, -1024)
+    assert hu.dtype == np.float32
+    np.testing.assert_array_equal(hu, _reference_hu(pixel_data, 2, -1024))
+    # Исходные значения помещаются в int16, но результат со смещением - нет
+    hu = _rescale_to_hu(np.array([0, 32000], dtype=np.uint16), 1, 1000)
+    assert hu.dtype == np.float32
+    np.testing.assert_array_equal(hu, [1000, 33000])
+
+
+def test_rescale_fractional_slope_gives_float32():
+    pixel_data = np.array([0, 1, 2000, 4095], dtype=np.uint16)
+    hu = _rescale_to_hu(pixel_data, 0.5, -1024)
+    assert hu.dtype == np.float32
+    np.testing.assert_allclose(hu, _reference_hu(pixel_data, 0.5, -1024), rtol=0, atol=1e-3)
+
+
+@pytest.mark.parametrize("slope, intercept", [(DSfloat('1'), DSfloat('-1024')), ('1.0', '-1024.0'), (DSfloat('1.00000'), '-1024')])
+def test_rescale_accepts_ds_string_tags(slope, intercept):
+    pixel_data = np.array([0, 24, 3071], dtype=np.int16)
+    hu = _rescale_to_hu(pixel_data, slope, intercept)
+    assert hu.dtype == np.int16
+    np.testing.assert_array_equal(hu, [-1024, -1000, 2047])
+
+
+def test_rescale_empty_slice():
+    hu = _rescale_to_hu(np.empty((0, 0), dtype=np.uint16), 1, -1024)
+    assert hu.shape == (0, 0)
+
+
+@pytest.mark.parametrize("low, high", [(-1024, 3071), (-32768, 32767), (-2000, -1990)])
+def test_normalize_int16_matches_float64_reference(low, high):
+    pixel_data = np.linspace(low, high, 512 * 3).astype(np.int16).reshape(3, 512)
+    min_val, max_val = float(pixel_data.min()), float(pixel_data.max())
+    expected = np.clip(255 * (pixel_data.astype(np.float64) - min_val) / (max_val - min_val), 0, 255).astype(np.uint8)
+    result = _normalize_to_uint8(pixel_data)
+    assert result.dtype == np.uint8
+    np.testing.assert_array_equal(result, expected)
+    assert result.min() == 0 and result.max() == 255
+
+
+def test_normalize_constant_slice_gives_zero_image():
+    result = _normalize_to_uint8(np.full((4, 4), -1024, dtype=np.int16))
+    assert result.dtype == np.uint8 and not result.any()
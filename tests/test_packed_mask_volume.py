@@ -0,0 +1,55 @@
+"""Тесты упакованной маски сегментации (PackedMaskVolume)."""
+
+import numpy as np
+import pytest
+
+from pylungviewer.gui.viewer_panel import PackedMaskVolume
+
+
+@pytest.fixture
+def mask():
+    # Ширина 13 не кратна 8: последний байт каждой строки упакован не полностью
+    rng = np.random.default_rng(0)
+    return (rng.random((3, 5, 13)) > 0.5).astype(np.uint8)
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.bool_, np.float32])
+def test_getitem_round_trip(mask, dtype):
+    packed = PackedMaskVolume(mask.astype(dtype))
+    assert packed.shape == mask.shape and len(packed) == 3
+    assert packed.nbytes == 3 * 5 * 2
+    for index in range(-3, 3):
+        slice_mask = packed[index]
+        assert slice_mask.dtype == np.uint8 and slice_mask.shape == (5, 13)
+        np.testing.assert_array_equal(slice_mask, mask[index])
+        assert not slice_mask.flags.writeable
+
+
+def test_getitem_negative_index_after_positive(mask):
+    packed = PackedMaskVolume(mask)
+    np.testing.assert_array_equal(packed[0], mask[0])
+    np.testing.assert_array_equal(packed[-1], mask[-1])
+    np.testing.assert_array_equal(packed[2], mask[2])
+    np.testing.assert_array_equal(packed[-3], mask[0])
+
+
+def test_slice_view_round_trip(mask):
+    packed = PackedMaskVolume(mask)
+    for index in (0, 1, 2, -1, -2, -3, 1):
+        view = packed.slice_view(index)
+        assert view.dtype == np.uint8 and view.shape == (5, 13)
+        np.testing.assert_array_equal(view, mask[index])
+        np.testing.assert_array_equal(view, packed[index])
+        assert not view.flags.writeable
+
+
+def test_slice_view_reuses_buffer(mask):
+    packed = PackedMaskVolume(mask)
+    first = packed.slice_view(0)
+    assert packed.slice_view(0) is first
+    second = packed.slice_view(-1)
+    assert np.shares_memory(first, second)
+    # Срез, полученный индексацией, не зависит от буфера отображения
+    stored = packed[0]
+    packed.slice_view(1)
+    np.testing.assert_array_equal(stored, mask[0])
@@ -0,0 +1,56 @@
+"""Тесты применения окна яркости/контраста (WindowPresets)."""
+
+import numpy as np
+import pytest
+
+from pylungviewer.utils.window_presets import WindowPresets
+
+
+def _reference_window(pixel_data, center, width):
+    """Исходная формула apply_window: ограничение диапазоном окна и 255 * (x - min) / (max - min)."""
+    min_val = center - width/2
+    max_val = center + width/2
+    result = np.clip(pixel_data.copy(), min_val, max_val)
+    if min_val != max_val:
+        result = 255 * (result - min_val) / (max_val - min_val)
+    return result.astype(np.uint8)
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16, np.int16, np.float32, np.float64])
+@pytest.mark.parametrize("center, width", [(40, 400), (-600, 1500), (400, 1800), (50, 350), (40, 80), (127.5, 3)])
+def test_apply_window_matches_reference_formula(dtype, center, width):
+    info = np.iinfo(dtype) if np.dtype(dtype).kind in 'iu' else None
+    if info is not None:
+        low, high = max(info.min, -2048), min(info.max, 4095)
+        pixel_data = np.arange(low, high + 1).astype(dtype)
+    else:
+        pixel_data = np.linspace(-2048, 4095, 40961).astype(dtype)
+    expected = _reference_window(pixel_data, center, width)
+    np.testing.assert_array_equal(WindowPresets.apply_window(pixel_data, center, width), expected)
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16, np.int16])
+def test_build_lut_matches_reference_formula(dtype):
+    lut = WindowPresets.build_lut(dtype, 40, 400)
+    values = np.arange(lut.size, dtype=np.uint64).astype(np.dtype(dtype).str.replace('i', 'u')).view(dtype)
+    np.testing.assert_array_equal(lut, _reference_window(values, 40, 400))
+
+
+def test_build_lut_unsupported_dtype():
+    assert WindowPresets.build_lut(np.float32, 40, 400) is None
+    assert WindowPresets.build_lut(np.int32, 40, 400) is None
+
+
+@pytest.mark.parametrize("dtype", [np.int16, np.float32])
+@pytest.mark.parametrize("width", [0, -100])
+def test_apply_window_non_positive_width_gives_zero_image(dtype, width):
+    pixel_data = np.array([[-1000, 0], [40, 3000]], dtype=dtype)
+    result = WindowPresets.apply_window(pixel_data, 40, width)
+    assert result.dtype == np.uint8 and result.shape == pixel_data.shape
+    assert not result.any()
+
+
+def test_build_lut_non_positive_width_gives_zero_lut():
+    lut = WindowPresets.build_lut(np.int16, 40, 0)
+    assert lut.dtype == np.uint8 and lut.size == 65536
+    assert not lut.any()